@@ -1,3 +1,10 @@
-from .agent import Agent
-
 __all__ = ["Agent"]
+
+
+def __getattr__(name):
+    # Keep `import agent_sdk` cheap: the agent and its dependencies load on first use
+    if name == "Agent":
+        from .agent import Agent
+        return Agent
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
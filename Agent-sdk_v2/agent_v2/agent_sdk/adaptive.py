@@ -0,0 +1,136 @@
+import threading
+import time
+from .config import AgentConfig
+from .stats import AgentStats
+
+
+def _clamp(value, low, high):
+    return max(low, min(high, value))
+
+
+class AdaptiveController:
+    """
+    AIMD tuning of batch size, linger and upload concurrency.
+
+    Every upload reports its latency, outcome and how full its batch
+    was. While uploads are accepted under `adaptive_target_latency`,
+    concurrency grows additively and the batch shape follows traffic:
+    batches that hit the size limit grow batch size and shorten linger;
+    under-filled batches lengthen linger so low traffic still ships
+    reasonably sized batches. A slow upload, a failure or a throttling
+    response (Retry-After) halves batch size and concurrency and
+    doubles linger, at most once per latency period so one congestion
+    episode isn't punished repeatedly.
+
+    The current settings are written to AgentConfig (batch_size,
+    flush_interval, max_in_flight), where the queue and sender read
+    them, and exported as `adaptive_*` agent stats gauges.
+    """
+
+    EWMA_WEIGHT = 0.3
+    DECREASE_FACTOR = 0.5
+
+    # Batch fill (events / batch_size) that counts as full or under-filled
+    FULL_FILL = 0.9
+    LOW_FILL = 0.5
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latency = None
+        self._last_decrease = 0.0
+        self._successes = 0
+
+        self.batch_size = _clamp(
+            AgentConfig.batch_size,
+            AgentConfig.adaptive_batch_min,
+            AgentConfig.adaptive_batch_max
+        )
+        self.linger = _clamp(
+            AgentConfig.flush_interval,
+            AgentConfig.adaptive_linger_min,
+            AgentConfig.adaptive_linger_max
+        )
+        self.concurrency = _clamp(
+            AgentConfig.max_in_flight,
+            AgentConfig.adaptive_concurrency_min,
+            AgentConfig.adaptive_concurrency_max
+        )
+
+        self._apply()
+
+    def record(self, latency, accepted, throttled=False, fill=1.0):
+        """
+        Feed one upload: seconds taken, accepted or not, server
+        throttling, and the batch's fill ratio against its limits.
+        """
+
+        with self._lock:
+            if self._latency is None:
+                self._latency = latency
+            else:
+                self._latency += self.EWMA_WEIGHT * (latency - self._latency)
+
+            target = AgentConfig.adaptive_target_latency
+
+            if throttled or not accepted or self._latency > target:
+                now = time.monotonic()
+                if throttled or now - self._last_decrease >= max(self._latency, target):
+                    self._decrease()
+                    self._last_decrease = now
+            else:
+                self._increase(fill)
+
+            self._apply()
+
+    def _increase(self, fill):
+
+        if fill >= self.FULL_FILL:
+            # Batches fill before linger runs out: bigger batches, sooner
+            self.batch_size = min(
+                AgentConfig.adaptive_batch_max,
+                self.batch_size + AgentConfig.adaptive_batch_min
+            )
+            self.linger = max(
+                AgentConfig.adaptive_linger_min,
+                self.linger - AgentConfig.adaptive_linger_min
+            )
+        elif fill < self.LOW_FILL:
+            # Linger runs out first: wait longer rather than ship tiny batches
+            self.linger = min(
+                AgentConfig.adaptive_linger_max,
+                self.linger + AgentConfig.adaptive_linger_min
+            )
+
+        # One more concurrent upload per full window of successes
+        self._successes += 1
+        if self._successes >= self.concurrency:
+            self._successes = 0
+            self.concurrency = min(
+                AgentConfig.adaptive_concurrency_max, self.concurrency + 1
+            )
+
+    def _decrease(self):
+        self._successes = 0
+        self.batch_size = max(
+            AgentConfig.adaptive_batch_min,
+            int(self.batch_size * self.DECREASE_FACTOR)
+        )
+        self.linger = min(
+            AgentConfig.adaptive_linger_max,
+            self.linger / self.DECREASE_FACTOR
+        )
+        self.concurrency = max(
+            AgentConfig.adaptive_concurrency_min,
+            int(self.concurrency * self.DECREASE_FACTOR)
+        )
+
+    def _apply(self):
+        AgentConfig.batch_size = self.batch_size
+        AgentConfig.flush_interval = self.linger
+        AgentConfig.max_in_flight = self.concurrency
+
+        AgentStats.gauge("adaptive_batch_size", self.batch_size)
+        AgentStats.gauge("adaptive_flush_interval", round(self.linger, 3))
+        AgentStats.gauge("adaptive_max_in_flight", self.concurrency)
+        if self._latency is not None:
+            AgentStats.gauge("adaptive_upload_latency_ms", int(self._latency * 1000))
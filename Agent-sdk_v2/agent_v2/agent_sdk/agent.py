@@ -1,8 +1,8 @@
+import os
 from .config import AgentConfig
-from .sender import Sender
-from .exceptions import ExceptionTracker
-from .network import install_http_patch
-from .logging_capture import install_logging
+from .queue import EventQueue
+from .identity import Identity
+from .stats import AgentStats
 
 
 class Agent:
@@ -26,7 +26,16 @@ class Agent:
         enable_exceptions: bool = True,
         enable_http: bool = True,
         enable_logging: bool = True,
-        enable_performance: bool = False
+        enable_performance: bool = False,
+
+        queue_capacity: int | None = None,
+        overflow_policy: str | None = None,
+        queue_mode: str | None = None,
+        lazy_start: bool = False,
+        transport: str = "http",
+
+        sample_rates: dict | None = None,
+        adaptive_sampling: bool | None = None
     ):
 
         if cls._initialized:
@@ -41,16 +50,42 @@ class Agent:
         AgentConfig.project = project
         AgentConfig.environment = environment
 
+        # Resolve the host IP off the caller's thread (DNS may be slow)
+        Identity.resolve_async()
+
+        # ----------------------------
+        # Event Buffer
+        # ----------------------------
+        EventQueue.configure(
+            capacity=queue_capacity,
+            policy=overflow_policy,
+            mode=queue_mode
+        )
+
+        # ----------------------------
+        # Sampling
+        # ----------------------------
+        if sample_rates is not None:
+            from .sampling import Sampler
+            Sampler.validate(sample_rates)
+            AgentConfig.sample_rates = dict(sample_rates)
+
+        if adaptive_sampling is not None:
+            AgentConfig.adaptive_sampling = adaptive_sampling
+
         # ----------------------------
         # Install Core Modules
         # ----------------------------
         if enable_exceptions:
+            from .exceptions import ExceptionTracker
             ExceptionTracker.install()
 
         if enable_http:
+            from .network import install_http_patch
             install_http_patch()
 
         if enable_logging:
+            from .logging_capture import install_logging
             install_logging()
 
         # ----------------------------
@@ -93,7 +128,71 @@ class Agent:
         # ----------------------------
         # Start Background Sender
         # ----------------------------
-        Sender.start()
+        AgentConfig.lazy_start = lazy_start
+        AgentConfig.transport = transport
+
+        if transport == "shm":
+            # The host's agent-sdk-shipper batches and uploads for us
+            from .shm import ShmTransport
+            EventQueue.set_transport(ShmTransport(AgentConfig.shm_name))
+
+        elif transport == "http":
+            from .sender import Sender
+            Sender.start(lazy=lazy_start)
+
+        elif transport == "file":
+            # A node-level log shipper picks up the segment files
+            from .file_sink import FileSink
+            FileSink.start(lazy=lazy_start)
+
+        else:
+            raise ValueError(f"Unsupported transport: {transport}")
+
+        # ----------------------------
+        # Success Pre-aggregation
+        # ----------------------------
+        if AgentConfig.aggregation:
+            from .metrics import EndpointMetrics
+            EndpointMetrics.start()
+
+        # ----------------------------
+        # Repeat Coalescing
+        # ----------------------------
+        if AgentConfig.coalesce:
+            from .coalesce import Coalescer
+            Coalescer.start()
+
+        # Pre-fork servers: give every child its own queue, sender and identity
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=cls._after_fork_in_child)
 
         cls._initialized = True
 
+    @staticmethod
+    def _after_fork_in_child():
+        try:
+            EventQueue.reset_after_fork()
+            AgentStats.reset_after_fork()
+            Identity.reset()
+
+            if AgentConfig.aggregation:
+                from .metrics import EndpointMetrics
+                EndpointMetrics.reset_after_fork()
+
+            if AgentConfig.coalesce:
+                from .coalesce import Coalescer
+                Coalescer.reset_after_fork()
+
+            if AgentConfig.adaptive_sampling:
+                from .sampling import Sampler
+                Sampler.reset_after_fork()
+
+            if AgentConfig.transport == "http":
+                from .sender import Sender
+                Sender._reset_after_fork()
+            elif AgentConfig.transport == "file":
+                from .file_sink import FileSink
+                FileSink._reset_after_fork()
+        except Exception:
+            pass  # Never break the forked worker
+
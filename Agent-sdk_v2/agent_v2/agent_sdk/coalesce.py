@@ -0,0 +1,211 @@
+import atexit
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from .config import AgentConfig
+from .event_builder import build_event, format_timestamp
+from .queue import EventQueue
+from .stats import AgentStats
+
+
+def exception_key(exc_type, frames):
+    """Exception type plus the raw frames from stacks.tb_frames."""
+    return ("EXCEPTION", exc_type, frames)
+
+
+def log_key(record):
+    """Logger, level and the unformatted message template."""
+    template = record.msg if isinstance(record.msg, str) else type(record.msg).__name__
+    return ("LOG", record.name, record.levelno, template)
+
+
+def fingerprint(key):
+    # Stable across processes and restarts, unlike hash()
+    parts = []
+    for part in key:
+        if isinstance(part, type):
+            parts.append(f"{part.__module__}.{part.__qualname__}")
+        elif isinstance(part, tuple):
+            parts.extend(
+                f"{code.co_filename}:{code.co_name}:{lineno}" for code, lineno, _ in part
+            )
+        else:
+            parts.append(str(part))
+
+    return hashlib.sha1("\n".join(parts).encode()).hexdigest()[:16]
+
+
+class _Entry:
+
+    __slots__ = ("fingerprint", "sample", "count", "opened", "first_ns", "last_ns")
+
+    def __init__(self, key):
+        self.fingerprint = fingerprint(key)
+        self.sample = None    # the event sent for the first occurrence
+        self.count = 0        # repeats absorbed since
+        self.opened = time.monotonic()
+        self.first_ns = None
+        self.last_ns = None
+
+
+class Coalescer:
+    """
+    Collapses repeated exceptions and log messages (AgentConfig.coalesce).
+
+    The first occurrence of a fingerprint is sent as usual. Repeats
+    within coalesce_window seconds are only counted, before any
+    traceback or message formatting, and sent as one summary event
+    when the window closes: the first event's fields without its
+    stacktrace, plus `coalesced`, the fingerprint, first/last repeat
+    timestamps and metrics.occurrences. At most coalesce_max_keys
+    fingerprints are tracked; the least recently seen is summarized
+    and evicted first.
+    """
+
+    _lock = threading.Lock()
+    _entries = OrderedDict()
+    _carried = OrderedDict()   # key -> forgotten entry whose repeats await the next window
+
+    _thread = None
+    _atexit_registered = False
+
+    @classmethod
+    def absorb(cls, key):
+        """
+        None when `key` repeats within its window (counted); otherwise
+        the new window's entry, for `attach` once the event is sent.
+        """
+
+        evicted = None
+
+        with cls._lock:
+            entry = cls._entries.get(key)
+
+            if entry is not None:
+                # A repeat, even while the first occurrence is still being sent
+                if time.monotonic() - entry.opened < AgentConfig.coalesce_window:
+                    now = time.time_ns()
+                    if entry.first_ns is None:
+                        entry.first_ns = now
+                    entry.last_ns = now
+                    entry.count += 1
+                    cls._entries.move_to_end(key)
+                    return None
+
+                # Window closed: summarize it and open a new one in its place
+                evicted = cls._entries.pop(key)
+
+            elif len(cls._entries) >= AgentConfig.coalesce_max_keys:
+                _, evicted = cls._entries.popitem(last=False)
+                AgentStats.incr("coalesce_evictions")
+
+            entry = cls._entries[key] = _Entry(key)
+
+            carried = cls._carried.pop(key, None)
+            if carried is not None:
+                entry.count = carried.count
+                entry.first_ns = carried.first_ns
+                entry.last_ns = carried.last_ns
+
+        if evicted is not None:
+            cls._summarize(evicted)
+
+        return entry
+
+    @classmethod
+    def attach(cls, entry, event):
+        """Record the first occurrence's event (before it's queued)."""
+        event.data["fingerprint"] = entry.fingerprint
+        entry.sample = event
+
+    @classmethod
+    def forget(cls, key):
+        """
+        The first occurrence wasn't sent (sampled out): the next one opens
+        the window, and inherits the repeats counted in the meantime.
+        """
+
+        with cls._lock:
+            entry = cls._entries.pop(key, None)
+            if entry is None or not entry.count:
+                return
+
+            if len(cls._carried) >= AgentConfig.coalesce_max_keys:
+                cls._carried.popitem(last=False)
+                AgentStats.incr("coalesce_evictions")
+            cls._carried[key] = entry
+
+    @classmethod
+    def flush(cls, expired_only=False):
+        """Queue summaries for closed windows (all windows unless expired_only)."""
+
+        now = time.monotonic()
+        closed = []
+
+        with cls._lock:
+            for key, entry in list(cls._entries.items()):
+                if not expired_only or now - entry.opened >= AgentConfig.coalesce_window:
+                    closed.append(cls._entries.pop(key))
+
+        for entry in closed:
+            cls._summarize(entry)
+
+    @staticmethod
+    def _summarize(entry):
+
+        sample = entry.sample
+        if sample is None or not entry.count:
+            return
+
+        data = {k: v for k, v in sample.data.items() if k != "stacktrace"}
+        data.update({
+            "coalesced": True,
+            "first_seen": format_timestamp(entry.first_ns),
+            "last_seen": format_timestamp(entry.last_ns)
+        })
+
+        EventQueue.push(build_event(
+            event_type=sample.event_type,
+            category=sample.category,
+            status=sample.status,
+            severity=sample.severity,
+            metrics={"occurrences": entry.count},
+            data=data
+        ))
+
+        AgentStats.incr("coalesced_events", entry.count)
+
+    # ----------------------------
+    # Background flush
+    # ----------------------------
+    @classmethod
+    def start(cls):
+        cls._thread = threading.Thread(
+            target=cls._run, name="agent-sdk-coalesce", daemon=True
+        )
+        cls._thread.start()
+
+        if not cls._atexit_registered:
+            atexit.register(cls.flush)
+            cls._atexit_registered = True
+
+    @classmethod
+    def _run(cls):
+        while True:
+            # Windows close at most ~1s (or a tenth of a window) late
+            time.sleep(min(1.0, AgentConfig.coalesce_window / 10))
+            try:
+                cls.flush(expired_only=True)
+            except Exception:
+                pass  # Never kill the flush thread
+
+    @classmethod
+    def reset_after_fork(cls):
+        # The parent summarizes its own windows
+        cls._lock = threading.Lock()
+        cls._entries = OrderedDict()
+        cls._carried = OrderedDict()
+
+        if cls._thread is not None:
+            cls.start()
@@ -0,0 +1,62 @@
+import gzip
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+
+def available_encodings():
+    """Content-Encodings this SDK can produce, in order of preference."""
+    encodings = ["gzip", "deflate"]
+    if zstandard is not None:
+        encodings.insert(0, "zstd")
+    return encodings
+
+
+def compress(body: bytes, encoding: str, level: int = 6) -> bytes:
+
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=level, mtime=0)
+
+    if encoding == "deflate":
+        return zlib.compress(body, level)
+
+    if encoding == "zstd" and zstandard is not None:
+        return zstandard.ZstdCompressor(level=level).compress(body)
+
+    raise ValueError(f"Unsupported content encoding: {encoding}")
+
+
+def compressor(encoding: str, level: int = 6):
+    """Incremental compressor (compress/flush) for streamed bodies."""
+
+    if encoding == "gzip":
+        return zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    if encoding == "deflate":
+        return zlib.compressobj(level)
+
+    if encoding == "zstd" and zstandard is not None:
+        return zstandard.ZstdCompressor(level=level).compressobj()
+
+    raise ValueError(f"Unsupported content encoding: {encoding}")
+
+
+def parse_accept_encoding(header: str):
+    """Codings listed in an Accept-Encoding header, minus any with q=0."""
+    accepted = []
+
+    for item in (header or "").split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+
+        if not name:
+            continue
+        if params.replace(" ", "").lower() in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+
+        accepted.append(name)
+
+    return accepted
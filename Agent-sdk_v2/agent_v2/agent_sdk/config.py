@@ -6,3 +6,124 @@ class AgentConfig:
     environment: str = "production"
     sdk_version: str = "2.0.0"
     schema_version: str = "1.0"
+    batch_schema_version: str = "1.0"   # "1.0" row events | "2.0" columnar (collector must support it)
+
+    # Event buffer
+    queue_capacity: int = 10000
+    overflow_policy: str = "drop_oldest"   # drop_oldest | drop_newest | drop_lowest_severity
+    queue_mode: str = "shared"             # shared | thread_local
+    thread_buffer_capacity: int = 2048     # per-thread bound in thread_local mode
+
+    # Priority lanes: these severities skip the main buffer and are sent
+    # within express_flush_interval; LOW events are shed first
+    express_severities: tuple = ("HIGH", "CRITICAL")
+    express_queue_capacity: int = 1000     # overflow falls back to the main buffer
+    express_flush_interval: float = 0.1
+    shed_low_watermark: float = 0.8        # buffer fill at which new LOW events are dropped (None: never)
+
+    # Head sampling, decided before an event is built: each event type is
+    # kept at its sample_rates entry (else sample_rate); kept events carry
+    # metrics.sample_weight = 1 / rate for extrapolation
+    sample_rate: float = 1.0
+    sample_rates: dict = {}                # e.g. {"INCOMING_REQUEST": 0.01}
+
+    # Adaptive sampling: rates of non-express severities are halved (down
+    # to sampling_min_scale) while the buffer is above sampling_target_fill
+    # or the collector pushes back, and recover once it drains
+    adaptive_sampling: bool = False
+    sampling_target_fill: float = 0.5
+    sampling_min_scale: float = 0.01
+    sampling_adjust_interval: float = 1.0
+
+    # Coalescing: repeats of an exception (type + frames) or log message
+    # (logger, level, template) within coalesce_window seconds are only
+    # counted; the first is sent, the rest as one summary when it closes
+    coalesce: bool = False
+    coalesce_window: float = 60.0
+    coalesce_max_keys: int = 1000          # fingerprints tracked (LRU)
+
+    # Pre-aggregation: successful requests, HTTP calls and DB queries are
+    # folded into per-key counters and latency sketches, sent as METRICS
+    # events every aggregation_interval; failures and calls slower than
+    # aggregation_slow_ms are still sent one by one
+    aggregation: bool = False
+    aggregation_interval: float = 10.0
+    aggregation_slow_ms: float = 1000.0
+    aggregation_max_keys: int = 1000       # distinct keys per interval; others pass through
+    aggregation_sketch: str = "ddsketch"   # ddsketch | histogram (log-linear)
+    sketch_relative_accuracy: float = 0.01 # DDSketch quantiles within 1%
+    sketch_max_bins: int = 2048            # per key; lowest bins fold beyond this
+
+    # Batching: flush at batch_size events or batch_max_bytes (estimated),
+    # or flush_interval seconds after the first queued event
+    batch_size: int = 500
+    batch_max_bytes: int = 1048576
+    flush_interval: float = 5.0
+
+    # Upload transport
+    http_pool_size: int = 4
+    http_timeout: float = 3.0
+
+    # Body format: auto (msgpack once the collector accepts it, else JSON)
+    # | json | msgpack (needs `msgpack`); JSON uses `orjson` when installed
+    serialization: str = "auto"
+
+    # Streaming upload: batches of at least stream_min_events events are
+    # sent as chunked NDJSON instead of one body (None: never stream)
+    stream_min_events: int = None
+    stream_chunk_bytes: int = 64 * 1024
+
+    # Body compression: None | gzip | deflate | zstd (needs `zstandard`)
+    compression: str = None
+    compression_level: int = 6
+    compression_min_bytes: int = 1024
+
+    # Disk spool for undeliverable batches (disabled while spool_dir is None)
+    spool_dir: str = None
+    spool_max_bytes: int = 256 * 1024 * 1024
+    spool_segment_bytes: int = 8 * 1024 * 1024
+    spool_replay_rate: float = 2.0   # batches per second
+
+    # Retries: jittered delay queue, capped by a fleet-friendly retry budget
+    retry_budget_ratio: float = 0.1    # retries allowed per send in the window
+    retry_budget_min: int = 10         # retries always allowed per window
+    retry_budget_window: float = 60.0
+    retry_queue_limit: int = 64        # batches waiting for a retry
+
+    # Concurrent uploads
+    max_in_flight: int = 1
+    max_in_flight_bytes: int = 8 * 1024 * 1024
+
+    # Adaptive batching: AIMD tuning of batch_size, flush_interval and
+    # max_in_flight from upload latency, failures and throttling, kept
+    # within these floors and ceilings
+    adaptive_batching: bool = False
+    adaptive_target_latency: float = 1.0   # seconds per upload
+    adaptive_batch_min: int = 50           # also the additive step
+    adaptive_batch_max: int = 5000
+    adaptive_linger_min: float = 0.5       # also the additive step
+    adaptive_linger_max: float = 30.0
+    adaptive_concurrency_min: int = 1
+    adaptive_concurrency_max: int = 8
+
+    # Longest the first batch waits for the background host IP lookup
+    identity_resolve_timeout: float = 1.0
+
+    # Start the sender thread on the first event instead of in Agent.init
+    lazy_start: bool = False
+
+    # Transport: "http" uploads from this process; "shm" hands events to
+    # the per-host agent-sdk-shipper through shared memory; "file" writes
+    # NDJSON segment files for a node-level log shipper
+    transport: str = "http"
+    shm_name: str = "agent_sdk_events"
+    shm_size: int = 64 * 1024 * 1024
+    shm_poll_interval: float = 0.05
+
+    # File transport: segments rotate at file_sink_max_bytes (on disk)
+    # or file_sink_rotate_interval seconds, whichever comes first
+    file_sink_dir: str = None
+    file_sink_max_bytes: int = 64 * 1024 * 1024
+    file_sink_rotate_interval: float = 300.0
+    file_sink_compression: str = None       # None | gzip | zstd (needs `zstandard`)
+    file_sink_buffer_bytes: int = 1024 * 1024
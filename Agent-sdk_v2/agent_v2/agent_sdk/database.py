@@ -1,7 +1,9 @@
 import time
 from sqlalchemy import event
 from .event_builder import build_event
+from .metrics import EndpointMetrics
 from .queue import EventQueue
+from .sampling import Sampler
 
 
 def extract_query_type(statement):
@@ -29,13 +31,25 @@ def install_sqlalchemy_monitor(engine):
     @event.listens_for(engine, "after_cursor_execute")
     def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
 
-        duration_ms = int(
-            (time.time() - context._query_start_time) * 1000
-        )
+        elapsed_ms = (time.time() - context._query_start_time) * 1000
+        duration_ms = int(elapsed_ms)
 
         query_type = extract_query_type(statement)
         table = extract_table_name(statement)
 
+        # Aggregation mode: fast queries only feed the table's histogram
+        if EndpointMetrics.record(
+            "DB_QUERY", "DATABASE",
+            {"query_type": query_type, "table": table},
+            elapsed_ms
+        ):
+            return
+
+        # Head sampling: skip building events that won't be kept
+        weight = Sampler.sample("DB_QUERY")
+        if weight is None:
+            return
+
         event_obj = build_event(
             event_type="DB_QUERY",
             category="DATABASE",
@@ -46,7 +60,8 @@ def install_sqlalchemy_monitor(engine):
             data={
                 "query_type": query_type,
                 "table": table
-            }
+            },
+            sample_weight=weight
         )
 
         EventQueue.push(event_obj)
@@ -54,6 +69,10 @@ def install_sqlalchemy_monitor(engine):
     @event.listens_for(engine, "handle_error")
     def handle_error(context):
 
+        weight = Sampler.sample("DB_ERROR")
+        if weight is None:
+            return
+
         duration_ms = 0
         if hasattr(context, "_query_start_time"):
             duration_ms = int(
@@ -75,7 +94,8 @@ def install_sqlalchemy_monitor(engine):
                 "table": table,
                 "exception_type": type(context.original_exception).__name__,
                 "message": str(context.original_exception)
-            }
+            },
+            sample_weight=weight
         )
 
         EventQueue.push(event_obj)
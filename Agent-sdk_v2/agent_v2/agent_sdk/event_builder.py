@@ -1,37 +1,128 @@
+import time
 import uuid
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from .config import AgentConfig
 from .identity import Identity
 from .severity import get_severity
+from .stacks import LazyStack
+
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Wall clock = monotonic clock + anchor (monotonic is immune to clock steps)
+_WALL_ANCHOR_NS = time.time_ns() - time.monotonic_ns()
 
 
 def current_utc():
     return datetime.now(timezone.utc).isoformat()
 
 
-def build_event(event_type, category, status, data, metrics=None):
-
-    return {
-        "meta": {
-            "sdk_version": AgentConfig.sdk_version,
-            "schema_version": AgentConfig.schema_version,
-            "timestamp": current_utc(),
-            "trace_id": str(uuid.uuid4()),
-            "project": AgentConfig.project,
-            "environment": AgentConfig.environment
-        },
-
-        "identity": Identity.collect(
-            api_key=AgentConfig.api_key
-        ),
-
-        "event": {
-            "category": category,
-            "type": event_type,
-            "severity": get_severity(event_type),
-            "status": status,
-            "metrics": metrics or {},
-            "data": data
+def format_timestamp(wall_ns):
+    return (_EPOCH + timedelta(microseconds=wall_ns // 1000)).isoformat()
+
+
+class EventRecord:
+    """
+    Compact event captured on the request thread.
+
+    Holds only raw values; trace ids, ISO timestamps, identity, the
+    nested dict schema and tracebacks (a LazyStack in data["stacktrace"])
+    are produced by `to_dict` on the sender thread.
+    """
+
+    __slots__ = (
+        "ts_ns", "event_type", "category", "status", "severity",
+        "metrics", "data", "process_id"
+    )
+
+    def __init__(self, ts_ns, event_type, category, status, severity,
+                 metrics, data, process_id=None):
+        self.ts_ns = ts_ns   # time.monotonic_ns()
+        self.event_type = event_type
+        self.category = category
+        self.status = status
+        self.severity = severity
+        self.metrics = metrics
+        self.data = data
+        self.process_id = process_id   # set when recorded by another process
+
+    def wall_ns(self):
+        return self.ts_ns + _WALL_ANCHOR_NS
+
+    def to_dict(self):
+
+        identity = Identity.collect(api_key=AgentConfig.api_key)
+        if self.process_id is not None:
+            identity = dict(identity, process_id=self.process_id)
+
+        data = self.data
+        stack = data.get("stacktrace") if data else None
+        if isinstance(stack, LazyStack):
+            data = dict(data, stacktrace=stack.render())
+
+        return {
+            "meta": {
+                "sdk_version": AgentConfig.sdk_version,
+                "schema_version": AgentConfig.schema_version,
+                "timestamp": format_timestamp(self.wall_ns()),
+                "trace_id": str(uuid.uuid4()),
+                "project": AgentConfig.project,
+                "environment": AgentConfig.environment
+            },
+
+            "identity": identity,
+
+            "event": {
+                "category": self.category,
+                "type": self.event_type,
+                "severity": self.severity,
+                "status": self.status,
+                "metrics": self.metrics,
+                "data": data
+            }
         }
-    }
 
+    def to_tuple(self, process_id):
+        """Plain tuple for other processes (wall-clock ns, not monotonic)."""
+
+        # Stacks travel as (filename, line, function) frames, still unformatted
+        data = self.data
+        stack = data.get("stacktrace") if data else None
+        if isinstance(stack, LazyStack):
+            data = dict(data, stacktrace=stack.portable())
+
+        return (
+            self.wall_ns(), self.event_type, self.category, self.status,
+            self.severity, self.metrics, data, process_id
+        )
+
+    @classmethod
+    def from_tuple(cls, values):
+        wall_ns, event_type, category, status, severity, metrics, data, pid = values
+
+        stack = data.get("stacktrace") if data else None
+        if isinstance(stack, tuple):
+            data["stacktrace"] = LazyStack(stack)
+
+        return cls(
+            wall_ns - _WALL_ANCHOR_NS, event_type, category, status,
+            severity, metrics, data, pid
+        )
+
+
+def build_event(event_type, category, status, data, metrics=None, severity=None,
+                sample_weight=1.0):
+
+    if sample_weight != 1.0:
+        # Kept by the sampler: the collector counts it sample_weight times
+        metrics = dict(metrics or {}, sample_weight=sample_weight)
+
+    return EventRecord(
+        time.monotonic_ns(),
+        event_type,
+        category,
+        status,
+        severity or get_severity(event_type),
+        metrics or {},
+        data
+    )
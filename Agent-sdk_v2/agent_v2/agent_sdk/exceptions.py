@@ -1,8 +1,11 @@
 import sys
-import traceback
 import threading
+from .coalesce import Coalescer, exception_key
+from .config import AgentConfig
 from .event_builder import build_event
 from .queue import EventQueue
+from .sampling import Sampler
+from .stacks import capture, tb_frames
 
 
 class ExceptionTracker:
@@ -42,15 +45,29 @@ class ExceptionTracker:
     @staticmethod
     def _process_exception(exc_type, exc_value, exc_traceback, handled):
 
-        stack = "".join(
-            traceback.format_exception(exc_type, exc_value, exc_traceback)
-        )
+        # Raw frames only; the traceback text is rendered on the sender thread
+        frames = tb_frames(exc_traceback)
+
+        # Repeats are counted and sampling decided before anything else is captured
+        entry = None
+        if AgentConfig.coalesce:
+            key = exception_key(exc_type, frames)
+            entry = Coalescer.absorb(key)
+            if entry is None:
+                return
+
+        weight = Sampler.sample("EXCEPTION")
+        if weight is None:
+            if entry is not None:
+                Coalescer.forget(key)
+            return
 
-        last_trace = traceback.extract_tb(exc_traceback)[-1] if exc_traceback else None
+        stack = capture(exc_type, exc_value, exc_traceback, frames)
 
-        file_name = last_trace.filename if last_trace else None
-        line_number = last_trace.lineno if last_trace else None
-        function_name = last_trace.name if last_trace else None
+        code, line_number, _ = frames[-1] if frames else (None, None, None)
+
+        file_name = code.co_filename if code else None
+        function_name = code.co_name if code else None
 
         payload = {
             "error_type": exc_type.__name__,
@@ -67,7 +84,11 @@ class ExceptionTracker:
             category="APPLICATION",
             status="FAILURE",
             data=payload,
-            metrics={}
+            metrics={},
+            sample_weight=weight
         )
 
+        if entry is not None:
+            Coalescer.attach(entry, event)
+
         EventQueue.push(event)
@@ -0,0 +1,313 @@
+"""
+File transport: batches appended as NDJSON to rotated segment files.
+
+For hosts where a node-level log shipper (Fluent Bit, Vector, ...) does
+the uploading. Each batch is written exactly as a streamed upload
+(`application/x-ndjson`): a `batch_meta` line, then one v1 event per
+line, so any batch read back with `read_batches` can be POSTed to
+`receive_logs` unchanged.
+
+    Agent.init(..., transport="file")   # with AgentConfig.file_sink_dir set
+
+Segments are named `<project>-<pid>-<utc time>-<seq>.ndjson[.gz|.zst]`
+and are written as `<name>.part`; the rename to `<name>` marks them
+complete, so shippers should only collect files without `.part`.
+"""
+import atexit
+import gzip
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from .compression import compressor, zstandard
+from .config import AgentConfig
+from .queue import EventQueue
+from .sender import Batch, Sender
+from .serializers import ndjson_chunks
+from .stats import AgentStats
+
+
+SUFFIXES = {None: ".ndjson", "gzip": ".ndjson.gz", "zstd": ".ndjson.zst"}
+PARTIAL = ".part"
+
+# Lines written per buffered write
+CHUNK_BYTES = 64 * 1024
+
+
+class _Segment:
+    """One open segment file and its compressor, if any."""
+
+    def __init__(self, directory, name, compression):
+        self.path = os.path.join(directory, name)
+        self.opened_at = time.monotonic()
+        self.file = open(
+            self.path + PARTIAL, "xb", buffering=AgentConfig.file_sink_buffer_bytes
+        )
+        self.stream = (
+            compressor(compression, AgentConfig.compression_level)
+            if compression else None
+        )
+
+    def write(self, chunk):
+        if self.stream is not None:
+            chunk = self.stream.compress(chunk)
+        self.file.write(chunk)
+
+    def size(self):
+        return self.file.tell()
+
+    def close(self):
+        if self.stream is not None:
+            self.file.write(self.stream.flush())
+        self.file.close()
+        os.replace(self.path + PARTIAL, self.path)
+
+
+class FileSink:
+
+    _segment = None
+    _sequence = 0
+
+    # Held from dequeuing a batch until it's written, and across fork()
+    _lock = threading.Lock()
+
+    _started = False
+    _thread = None
+    _hooks_registered = False
+
+    @staticmethod
+    def start(lazy=False):
+        """
+        Start the writer thread. With `lazy`, it's only created when
+        the first event is queued.
+        """
+
+        if not AgentConfig.file_sink_dir:
+            raise ValueError("The file transport requires AgentConfig.file_sink_dir")
+
+        compression = AgentConfig.file_sink_compression
+        if compression not in SUFFIXES:
+            raise ValueError(f"Unsupported file sink compression: {compression}")
+        if compression == "zstd" and zstandard is None:
+            raise ValueError("file_sink_compression='zstd' requires `zstandard`")
+
+        os.makedirs(AgentConfig.file_sink_dir, exist_ok=True)
+        FileSink._started = True
+
+        if not FileSink._hooks_registered:
+            atexit.register(FileSink.close)
+            if hasattr(os, "register_at_fork"):
+                os.register_at_fork(
+                    before=FileSink._before_fork,
+                    after_in_parent=FileSink._after_fork_in_parent
+                )
+            FileSink._hooks_registered = True
+
+        if lazy:
+            EventQueue.set_start_hook(FileSink._start_thread)
+        else:
+            FileSink._start_thread()
+
+    @staticmethod
+    def _start_thread():
+        FileSink._thread = threading.Thread(
+            target=FileSink._run, name="agent-sdk-file-sink", daemon=True
+        )
+        FileSink._thread.start()
+
+    @staticmethod
+    def _run():
+        while True:
+            if EventQueue.wait_for_batch(FileSink._next_wakeup()):
+                with FileSink._lock:
+                    events = EventQueue.flush(limit=AgentConfig.batch_size)
+                    if events:
+                        FileSink._write(Batch.from_records(events))
+            else:
+                # Idle: hand buffered lines to the OS, close an expired segment
+                FileSink._flush()
+
+    @staticmethod
+    def _next_wakeup():
+        # Idle flush or rotation of the open segment; None sleeps until events arrive
+        segment = FileSink._segment
+        if segment is None:
+            return None
+
+        age = time.monotonic() - segment.opened_at
+        return max(0.0, min(
+            AgentConfig.flush_interval,
+            AgentConfig.file_sink_rotate_interval - age
+        ))
+
+    @staticmethod
+    def _write(batch):
+        # Caller holds _lock
+
+        chunks = ndjson_chunks(
+            Sender._batch_meta(batch, AgentConfig.schema_version),
+            batch.events,
+            CHUNK_BYTES
+        )
+
+        try:
+            segment = FileSink._open_segment()
+            for chunk in chunks:
+                segment.write(chunk)
+
+            AgentStats.incr("file_sink_batches")
+        except OSError:
+            # e.g. disk full: drop this batch, start a fresh segment for the next
+            AgentStats.incr("file_sink_write_errors")
+            FileSink._close_segment()
+
+    @staticmethod
+    def _open_segment():
+        # Rotate on size or age before writing the next batch
+        segment = FileSink._segment
+
+        if segment is not None and (
+            segment.size() >= AgentConfig.file_sink_max_bytes
+            or time.monotonic() - segment.opened_at >= AgentConfig.file_sink_rotate_interval
+        ):
+            FileSink._close_segment()
+            segment = None
+
+        if segment is None:
+            FileSink._sequence += 1
+            compression = AgentConfig.file_sink_compression
+            started = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+            name = (
+                f"{AgentConfig.project}-{os.getpid()}-{started}-"
+                f"{FileSink._sequence:06d}{SUFFIXES[compression]}"
+            )
+
+            segment = FileSink._segment = _Segment(
+                AgentConfig.file_sink_dir, name, compression
+            )
+            AgentStats.incr("file_sink_segments")
+
+        return segment
+
+    @staticmethod
+    def _close_segment():
+        segment, FileSink._segment = FileSink._segment, None
+        if segment is None:
+            return
+
+        try:
+            segment.close()
+        except OSError:
+            AgentStats.incr("file_sink_write_errors")
+
+    @staticmethod
+    def _flush():
+        with FileSink._lock:
+            segment = FileSink._segment
+            if segment is None:
+                return
+
+            if time.monotonic() - segment.opened_at >= AgentConfig.file_sink_rotate_interval:
+                FileSink._close_segment()
+                return
+
+            try:
+                segment.file.flush()
+            except OSError:
+                AgentStats.incr("file_sink_write_errors")
+                FileSink._close_segment()
+
+    @staticmethod
+    def close():
+        """Write out events still queued and complete the open segment."""
+
+        if not FileSink._started:
+            return
+
+        with FileSink._lock:
+            while True:
+                events = EventQueue.flush(limit=AgentConfig.batch_size)
+                if not events:
+                    break
+                FileSink._write(Batch.from_records(events))
+
+            FileSink._close_segment()
+
+    # ----------------------------
+    # Fork safety
+    # ----------------------------
+    @staticmethod
+    def _before_fork():
+        # An empty write buffer means the child can't repeat the parent's lines
+        FileSink._lock.acquire()
+        if FileSink._segment is not None:
+            try:
+                FileSink._segment.file.flush()
+            except OSError:
+                pass
+
+    @staticmethod
+    def _after_fork_in_parent():
+        FileSink._lock.release()
+
+    @staticmethod
+    def _reset_after_fork():
+        # The parent keeps writing its segment; the child starts its own
+        segment = FileSink._segment
+        if segment is not None:
+            try:
+                segment.file.close()   # buffer was flushed before the fork
+            except OSError:
+                pass
+
+        FileSink._segment = None
+        FileSink._sequence = 0
+        FileSink._thread = None
+        FileSink._lock = threading.Lock()
+
+        if FileSink._started:
+            if AgentConfig.lazy_start:
+                EventQueue.set_start_hook(FileSink._start_thread)
+            else:
+                FileSink._start_thread()
+
+
+def read_batches(path):
+    """
+    NDJSON bodies of the batches in a segment file, one per batch, for
+    replaying with Content-Type `application/x-ndjson`.
+    """
+
+    if path.endswith(".gz"):
+        fh = gzip.open(path, "rb")
+    elif path.endswith(".zst"):
+        if zstandard is None:
+            raise ValueError("Reading .zst segments requires `zstandard`")
+        fh = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+    else:
+        fh = open(path, "rb")
+
+    lines = []
+
+    with fh:
+        # stream_reader isn't line-iterable; split its chunks ourselves
+        pending = b""
+        while True:
+            chunk = fh.read(CHUNK_BYTES)
+            if not chunk:
+                break
+
+            split = (pending + chunk).split(b"\n")
+            pending = split.pop()
+
+            for line in split:
+                if line.startswith(b'{"batch_meta"') and lines:
+                    yield b"".join(lines)
+                    lines = []
+                if line:
+                    lines.append(line + b"\n")
+
+        # A torn last line (crash mid-write) is left out
+        if lines:
+            yield b"".join(lines)
@@ -1,37 +1,78 @@
 import socket
 import platform
 import os
+import threading
 import uuid
+from .config import AgentConfig
 
 
 class Identity:
 
     _cached_identity = None
+    _instance_id = None
 
-    @classmethod
-    def collect(cls, api_key, app_version="1.0.0", region="unknown"):
+    # Host IP, looked up in the background (DNS can hang for seconds)
+    _ip = None
+    _resolver = None
+    _lock = threading.Lock()
 
-        if cls._cached_identity:
-            return cls._cached_identity
+    @classmethod
+    def resolve_async(cls):
+        """Start the host IP lookup on a background thread (once)."""
+        with cls._lock:
+            if cls._resolver is not None or cls._ip is not None:
+                return
 
-        hostname = socket.gethostname()
+            cls._resolver = threading.Thread(
+                target=cls._resolve, name="agent-sdk-identity", daemon=True
+            )
+            cls._resolver.start()
 
+    @classmethod
+    def _resolve(cls):
         try:
-            ip = socket.gethostbyname(hostname)
+            ip = socket.gethostbyname(socket.gethostname())
         except Exception:
             ip = "unknown"
 
+        cls._ip = ip
+
+    @classmethod
+    def collect(cls, api_key, app_version="1.0.0", region="unknown"):
+
+        # Rebuilt once more if the IP shows up after a timed-out lookup
+        identity = cls._cached_identity
+        if identity and identity["ip"] == (cls._ip or "unknown"):
+            return identity
+
+        if cls._ip is None:
+            cls.resolve_async()
+            resolver = cls._resolver
+            if resolver is not None:
+                resolver.join(AgentConfig.identity_resolve_timeout)
+
+        if cls._instance_id is None:
+            cls._instance_id = str(uuid.uuid4())
+
         cls._cached_identity = {
             "api_key": api_key,
-            "hostname": hostname,
-            "ip": ip,
+            "hostname": socket.gethostname(),
+            "ip": cls._ip or "unknown",
             "region": region,
             "os": platform.system(),
             "os_version": platform.release(),
             "python_version": platform.python_version(),
             "process_id": os.getpid(),
             "app_version": app_version,
-            "instance_id": str(uuid.uuid4())
+            "instance_id": cls._instance_id
         }
 
         return cls._cached_identity
+
+    @classmethod
+    def reset(cls):
+        """Forget the cached identity (e.g. in a forked child)."""
+        cls._cached_identity = None
+        cls._instance_id = None
+        cls._resolver = None   # threads don't survive fork; a known IP does
+        cls._lock = threading.Lock()
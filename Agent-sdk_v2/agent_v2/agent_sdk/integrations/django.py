@@ -1,6 +1,8 @@
 import time
 from ..event_builder import build_event
+from ..metrics import EndpointMetrics
 from ..queue import EventQueue
+from ..sampling import Sampler
 
 
 class AgentDjangoMiddleware:
@@ -14,7 +16,8 @@ class AgentDjangoMiddleware:
 
         try:
             response = self.get_response(request)
-            duration_ms = int((time.time() - start_time) * 1000)
+            elapsed_ms = (time.time() - start_time) * 1000
+            duration_ms = int(elapsed_ms)
 
             status_code = response.status_code
 
@@ -29,6 +32,20 @@ class AgentDjangoMiddleware:
                 event_type = "INCOMING_REQUEST"
                 status = "SUCCESS"
 
+                # Aggregation mode: fast successes only feed the route's histogram
+                match = getattr(request, "resolver_match", None)
+                if EndpointMetrics.record(
+                    event_type, "APPLICATION",
+                    {"route": getattr(match, "route", None) or request.path, "method": request.method},
+                    elapsed_ms, status_code
+                ):
+                    return response
+
+            # Head sampling: skip building events that won't be kept
+            weight = Sampler.sample(event_type)
+            if weight is None:
+                return response
+
             event = build_event(
                 event_type=event_type,
                 category="APPLICATION",
@@ -40,7 +57,8 @@ class AgentDjangoMiddleware:
                     "path": request.path,
                     "method": request.method,
                     "status_code": status_code
-                }
+                },
+                sample_weight=weight
             )
 
             EventQueue.push(event)
@@ -50,21 +68,24 @@ class AgentDjangoMiddleware:
         except Exception as e:
             duration_ms = int((time.time() - start_time) * 1000)
 
-            event = build_event(
-                event_type="SERVER_ERROR",
-                category="APPLICATION",
-                status="FAILURE",
-                metrics={
-                    "duration_ms": duration_ms
-                },
-                data={
-                    "path": request.path,
-                    "method": request.method,
-                    "exception_type": type(e).__name__,
-                    "message": str(e)
-                }
-            )
+            weight = Sampler.sample("SERVER_ERROR")
+            if weight is not None:
+                event = build_event(
+                    event_type="SERVER_ERROR",
+                    category="APPLICATION",
+                    status="FAILURE",
+                    metrics={
+                        "duration_ms": duration_ms
+                    },
+                    data={
+                        "path": request.path,
+                        "method": request.method,
+                        "exception_type": type(e).__name__,
+                        "message": str(e)
+                    },
+                    sample_weight=weight
+                )
 
-            EventQueue.push(event)
+                EventQueue.push(event)
 
             raise
@@ -2,7 +2,9 @@ import time
 from fastapi import Request
 from starlette.middleware.base import BaseHTTPMiddleware
 from ..event_builder import build_event
+from ..metrics import EndpointMetrics
 from ..queue import EventQueue
+from ..sampling import Sampler
 
 
 class AgentFastAPIMiddleware(BaseHTTPMiddleware):
@@ -13,7 +15,8 @@ class AgentFastAPIMiddleware(BaseHTTPMiddleware):
 
         try:
             response = await call_next(request)
-            duration_ms = int((time.time() - start_time) * 1000)
+            elapsed_ms = (time.time() - start_time) * 1000
+            duration_ms = int(elapsed_ms)
 
             status_code = response.status_code
 
@@ -28,6 +31,20 @@ class AgentFastAPIMiddleware(BaseHTTPMiddleware):
                 event_type = "INCOMING_REQUEST"
                 status = "SUCCESS"
 
+                # Aggregation mode: fast successes only feed the route's histogram
+                route = request.scope.get("route")
+                if EndpointMetrics.record(
+                    event_type, "APPLICATION",
+                    {"route": getattr(route, "path", request.url.path), "method": request.method},
+                    elapsed_ms, status_code
+                ):
+                    return response
+
+            # Head sampling: skip building events that won't be kept
+            weight = Sampler.sample(event_type)
+            if weight is None:
+                return response
+
             event = build_event(
                 event_type=event_type,
                 category="APPLICATION",
@@ -39,7 +56,8 @@ class AgentFastAPIMiddleware(BaseHTTPMiddleware):
                     "path": request.url.path,
                     "method": request.method,
                     "status_code": status_code
-                }
+                },
+                sample_weight=weight
             )
 
             EventQueue.push(event)
@@ -49,22 +67,25 @@ class AgentFastAPIMiddleware(BaseHTTPMiddleware):
         except Exception as e:
             duration_ms = int((time.time() - start_time) * 1000)
 
-            event = build_event(
-                event_type="SERVER_ERROR",
-                category="APPLICATION",
-                status="FAILURE",
-                metrics={
-                    "duration_ms": duration_ms
-                },
-                data={
-                    "path": request.url.path,
-                    "method": request.method,
-                    "exception_type": type(e).__name__,
-                    "message": str(e)
-                }
-            )
-
-            EventQueue.push(event)
+            weight = Sampler.sample("SERVER_ERROR")
+            if weight is not None:
+                event = build_event(
+                    event_type="SERVER_ERROR",
+                    category="APPLICATION",
+                    status="FAILURE",
+                    metrics={
+                        "duration_ms": duration_ms
+                    },
+                    data={
+                        "path": request.url.path,
+                        "method": request.method,
+                        "exception_type": type(e).__name__,
+                        "message": str(e)
+                    },
+                    sample_weight=weight
+                )
+
+                EventQueue.push(event)
 
             raise
 
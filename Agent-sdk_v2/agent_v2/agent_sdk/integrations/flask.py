@@ -1,7 +1,9 @@
 import time
 from flask import request, g
 from ..event_builder import build_event
+from ..metrics import EndpointMetrics
 from ..queue import EventQueue
+from ..sampling import Sampler
 
 
 def init_flask(app):
@@ -14,9 +16,8 @@ def init_flask(app):
     def _log_request(response):
 
         try:
-            duration_ms = int(
-                (time.time() - g._agent_start_time) * 1000
-            )
+            elapsed_ms = (time.time() - g._agent_start_time) * 1000
+            duration_ms = int(elapsed_ms)
 
             status_code = response.status_code
 
@@ -35,6 +36,20 @@ def init_flask(app):
                 event_type = "INCOMING_REQUEST"
                 status = "SUCCESS"
 
+                # Aggregation mode: fast successes only feed the route's histogram
+                rule = request.url_rule
+                if EndpointMetrics.record(
+                    event_type, "APPLICATION",
+                    {"route": rule.rule if rule else request.path, "method": request.method},
+                    elapsed_ms, status_code
+                ):
+                    return response
+
+            # Head sampling: skip building events that won't be kept
+            weight = Sampler.sample(event_type)
+            if weight is None:
+                return response
+
             event = build_event(
                 event_type=event_type,
                 category="APPLICATION",
@@ -46,7 +61,8 @@ def init_flask(app):
                     "path": request.path,
                     "method": request.method,
                     "status_code": status_code
-                }
+                },
+                sample_weight=weight
             )
 
             EventQueue.push(event)
@@ -1,7 +1,10 @@
 import logging
-import traceback
+from .coalesce import Coalescer, log_key
+from .config import AgentConfig
 from .event_builder import build_event
 from .queue import EventQueue
+from .sampling import Sampler
+from .stacks import capture
 
 
 LOG_LEVEL_SEVERITY = {
@@ -20,11 +23,24 @@ class AgentLogHandler(logging.Handler):
         try:
             severity = LOG_LEVEL_SEVERITY.get(record.levelno, "LOW")
 
+            # Repeats are counted and sampling decided before the
+            # message and traceback are formatted
+            entry = None
+            if AgentConfig.coalesce:
+                key = log_key(record)
+                entry = Coalescer.absorb(key)
+                if entry is None:
+                    return
+
+            weight = Sampler.sample("LOG", severity)
+            if weight is None:
+                if entry is not None:
+                    Coalescer.forget(key)
+                return
+
             stacktrace = None
             if record.exc_info:
-                stacktrace = "".join(
-                    traceback.format_exception(*record.exc_info)
-                )
+                stacktrace = capture(*record.exc_info)
 
             event = build_event(
                 event_type="LOG",
@@ -38,11 +54,13 @@ class AgentLogHandler(logging.Handler):
                     "file": record.pathname,
                     "line": record.lineno,
                     "stacktrace": stacktrace
-                }
+                },
+                severity=severity,
+                sample_weight=weight
             )
 
-            # Override severity manually
-            event["event"]["severity"] = severity
+            if entry is not None:
+                Coalescer.attach(entry, event)
 
             EventQueue.push(event)
 
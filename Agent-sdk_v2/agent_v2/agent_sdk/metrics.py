@@ -0,0 +1,201 @@
+import atexit
+import threading
+import time
+from .config import AgentConfig
+from .event_builder import build_event, format_timestamp
+from .queue import EventQueue
+from .sketch import DDSketch
+from .stats import AgentStats
+
+
+class Histogram:
+    """
+    Log-linear latency histogram in microseconds.
+
+    Values below 2**SUB_BUCKET_BITS get a bucket each; above that every
+    power of two is split into 2**(SUB_BUCKET_BITS - 1) equal buckets,
+    so a bucket is at most ~6% wide. Buckets are keyed by their lower
+    bound, which makes histograms from any process trivially mergeable.
+    """
+
+    SUB_BUCKET_BITS = 5
+
+    __slots__ = ("buckets", "count", "total", "min", "max")
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def record(self, value):
+        value = max(0, int(value))
+
+        shift = value.bit_length() - self.SUB_BUCKET_BITS
+        lower = (value >> shift) << shift if shift > 0 else value
+
+        self.buckets[lower] = self.buckets.get(lower, 0) + 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def to_dict(self):
+        return {
+            "scheme": "log-linear",
+            "sub_bucket_bits": self.SUB_BUCKET_BITS,
+            "buckets": sorted(self.buckets.items())
+        }
+
+
+class EndpointMetrics:
+    """
+    Client-side pre-aggregation of successful requests, HTTP calls and
+    DB queries (AgentConfig.aggregation).
+
+    Successes are folded into per-key counters and a latency sketch
+    (DDSketch, or a log-linear Histogram with aggregation_sketch =
+    "histogram"), and one METRICS event per key is queued every
+    aggregation_interval.
+    Failures and keys beyond aggregation_max_keys still go out as
+    individual events. So do slow calls (aggregation_slow_ms and up):
+    they stay in the latency sketch, so quantiles see the tail, but are
+    left out of the METRICS `count` and reported as `outliers` instead.
+    """
+
+    _lock = threading.Lock()
+    _data = {}
+    _outliers = {}   # slot -> slow calls sent individually this interval
+    _interval_start = time.time_ns()
+
+    _thread = None
+    _atexit_registered = False
+
+    @classmethod
+    def record(cls, event_type, category, key, duration_ms, status_code=None):
+        """
+        Count one successful call under `key` (a dict of low-cardinality
+        fields such as route and method). Returns True when the call was
+        absorbed, False when the caller should send its event. A slow
+        call is still added to the key's latency sketch, but is sent
+        individually and left out of the aggregate count.
+        """
+
+        if not AgentConfig.aggregation:
+            return False
+
+        status_class = f"{status_code // 100}xx" if status_code else None
+        slot = (event_type, category, tuple(key.items()), status_class)
+
+        with cls._lock:
+            sketch = cls._data.get(slot)
+
+            if sketch is None:
+                if len(cls._data) >= AgentConfig.aggregation_max_keys:
+                    AgentStats.incr("aggregation_key_overflow")
+                    return False
+                sketch = cls._data[slot] = cls._new_sketch()
+
+            sketch.record(duration_ms * 1000)
+
+            if duration_ms < AgentConfig.aggregation_slow_ms:
+                return True
+
+            cls._outliers[slot] = cls._outliers.get(slot, 0) + 1
+
+        return False
+
+    @staticmethod
+    def _new_sketch():
+        kind = AgentConfig.aggregation_sketch
+
+        if kind == "ddsketch":
+            return DDSketch(AgentConfig.sketch_relative_accuracy, AgentConfig.sketch_max_bins)
+        if kind == "histogram":
+            return Histogram()
+
+        raise ValueError(f"Unsupported aggregation sketch: {kind}")
+
+    @classmethod
+    def snapshot(cls):
+        with cls._lock:
+            snapshot, cls._data = cls._data, {}
+            outliers, cls._outliers = cls._outliers, {}
+            started, cls._interval_start = cls._interval_start, time.time_ns()
+        return snapshot, outliers, started
+
+    @classmethod
+    def flush(cls):
+        """Queue one METRICS event per key aggregated since the last flush."""
+
+        snapshot, outliers, started = cls.snapshot()
+        interval = round((time.time_ns() - started) / 1e9, 3)
+
+        for slot, sketch in snapshot.items():
+            event_type, category, key, status_class = slot
+            slow = outliers.get(slot, 0)
+
+            data = {
+                "source_type": event_type,
+                **dict(key),
+                "interval_start": format_timestamp(started),
+                "interval_s": interval,
+                "latency_us": sketch.to_dict()
+            }
+            if status_class:
+                data["status_class"] = status_class
+
+            EventQueue.push(build_event(
+                event_type="METRICS",
+                category=category,
+                status="SUCCESS",
+                severity="MEDIUM",   # never shed with LOW traffic
+                metrics={
+                    # Absorbed calls only; latency_us and the ms fields cover outliers too
+                    "count": sketch.count - slow,
+                    "outliers": slow,
+                    "sum_ms": sketch.total / 1000,
+                    "min_ms": sketch.min / 1000,
+                    "max_ms": sketch.max / 1000
+                },
+                data=data
+            ))
+
+    # ----------------------------
+    # Background flush
+    # ----------------------------
+    @classmethod
+    def start(cls):
+        cls._new_sketch()   # reject an unknown aggregation_sketch up front
+
+        cls._thread = threading.Thread(
+            target=cls._run, name="agent-sdk-metrics", daemon=True
+        )
+        cls._thread.start()
+
+        if not cls._atexit_registered:
+            atexit.register(cls.flush)
+            cls._atexit_registered = True
+
+    @classmethod
+    def _run(cls):
+        while True:
+            time.sleep(AgentConfig.aggregation_interval)
+            try:
+                cls.flush()
+            except Exception:
+                pass  # Never kill the flush thread
+
+    @classmethod
+    def reset_after_fork(cls):
+        # The parent reports what it aggregated; the child starts empty
+        cls._lock = threading.Lock()
+        cls._data = {}
+        cls._outliers = {}
+        cls._interval_start = time.time_ns()
+
+        if cls._thread is not None:
+            cls.start()
@@ -2,7 +2,9 @@ import time
 import requests
 from urllib.parse import urlparse
 from .event_builder import build_event
+from .metrics import EndpointMetrics
 from .queue import EventQueue
+from .sampling import Sampler
 from .config import AgentConfig
 
 
@@ -19,6 +21,10 @@ def install_http_patch():
 
     def patched_request(self, method, url, **kwargs):
 
+        # 🔥 Ignore the SDK's own upload session
+        if getattr(self, "_agent_internal", False):
+            return _original_request(self, method, url, **kwargs)
+
         # 🔥 Ignore SDK internal endpoint
         if AgentConfig.endpoint:
             try:
@@ -31,70 +37,85 @@ def install_http_patch():
 
         try:
             response = _original_request(self, method, url, **kwargs)
-            duration_ms = int((time.time() - start) * 1000)
+            elapsed_ms = (time.time() - start) * 1000
+            duration_ms = int(elapsed_ms)
 
             # ----------------------------
             # HTTP 4xx / 5xx Handling
             # ----------------------------
             if response.status_code >= 400:
 
-                event = build_event(
-                    event_type="HTTP_ERROR",
-                    category="NETWORK",
-                    status="FAILURE",
-                    metrics={
-                        "duration_ms": duration_ms
-                    },
-                    data={
-                        "method": method,
-                        "url": url,
-                        "status_code": response.status_code,
-                        "response_size": len(response.content)
-                    }
-                )
+                # Head sampling: skip building events that won't be kept
+                weight = Sampler.sample("HTTP_ERROR")
+                if weight is not None:
+                    event = build_event(
+                        event_type="HTTP_ERROR",
+                        category="NETWORK",
+                        status="FAILURE",
+                        metrics={
+                            "duration_ms": duration_ms
+                        },
+                        data={
+                            "method": method,
+                            "url": url,
+                            "status_code": response.status_code,
+                            "response_size": len(response.content)
+                        },
+                        sample_weight=weight
+                    )
+
+                    EventQueue.push(event)
+
+            elif not EndpointMetrics.record(
+                "HTTP_CALL", "NETWORK",
+                {"host": urlparse(url).netloc, "method": method.upper()},
+                elapsed_ms, response.status_code
+            ):
+                # Successful call (in aggregation mode, only slow ones)
+                weight = Sampler.sample("HTTP_CALL")
+                if weight is not None:
+                    event = build_event(
+                        event_type="HTTP_CALL",
+                        category="NETWORK",
+                        status="SUCCESS",
+                        metrics={
+                            "duration_ms": duration_ms
+                        },
+                        data={
+                            "method": method,
+                            "url": url,
+                            "status_code": response.status_code
+                        },
+                        sample_weight=weight
+                    )
+
+                    EventQueue.push(event)
 
-                EventQueue.push(event)
+            return response
+
+        except Exception as e:
+            duration_ms = int((time.time() - start) * 1000)
 
-            else:
-                # Successful call
+            weight = Sampler.sample("HTTP_EXCEPTION")
+            if weight is not None:
                 event = build_event(
-                    event_type="HTTP_CALL",
+                    event_type="HTTP_EXCEPTION",
                     category="NETWORK",
-                    status="SUCCESS",
+                    status="FAILURE",
                     metrics={
                         "duration_ms": duration_ms
                     },
                     data={
                         "method": method,
                         "url": url,
-                        "status_code": response.status_code
-                    }
+                        "exception_type": type(e).__name__,
+                        "message": str(e)
+                    },
+                    sample_weight=weight
                 )
 
                 EventQueue.push(event)
 
-            return response
-
-        except Exception as e:
-            duration_ms = int((time.time() - start) * 1000)
-
-            event = build_event(
-                event_type="HTTP_EXCEPTION",
-                category="NETWORK",
-                status="FAILURE",
-                metrics={
-                    "duration_ms": duration_ms
-                },
-                data={
-                    "method": method,
-                    "url": url,
-                    "exception_type": type(e).__name__,
-                    "message": str(e)
-                }
-            )
-
-            EventQueue.push(event)
-
             raise
 
     requests.Session.request = patched_request
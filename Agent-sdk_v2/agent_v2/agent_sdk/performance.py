@@ -2,6 +2,7 @@ import time
 from functools import wraps
 from .event_builder import build_event
 from .queue import EventQueue
+from .sampling import Sampler
 
 
 DEFAULT_SLOW_THRESHOLD_MS = 500
@@ -28,20 +29,25 @@ def monitor_performance(threshold_ms=DEFAULT_SLOW_THRESHOLD_MS):
                     event_type = "FUNCTION_CALL"
                     status = "SUCCESS"
 
-                event = build_event(
-                    event_type=event_type,
-                    category="APPLICATION",
-                    status=status,
-                    metrics={
-                        "duration_ms": duration_ms
-                    },
-                    data={
-                        "function_name": func.__name__,
-                        "module": func.__module__
-                    }
-                )
-
-                EventQueue.push(event)
+                # Head sampling; no early return here, it would swallow exceptions
+                weight = Sampler.sample(event_type)
+
+                if weight is not None:
+                    event = build_event(
+                        event_type=event_type,
+                        category="APPLICATION",
+                        status=status,
+                        metrics={
+                            "duration_ms": duration_ms
+                        },
+                        data={
+                            "function_name": func.__name__,
+                            "module": func.__module__
+                        },
+                        sample_weight=weight
+                    )
+
+                    EventQueue.push(event)
 
         return wrapper
 
@@ -1,19 +1,538 @@
 import threading
+import time
+from .config import AgentConfig
+from .stacks import LazyStack
+
+
+OVERFLOW_POLICIES = ("drop_oldest", "drop_newest", "drop_lowest_severity")
+
+QUEUE_MODES = ("shared", "thread_local")
+
+SEVERITY_RANK = {
+    "LOW": 0,
+    "MEDIUM": 1,
+    "HIGH": 2,
+    "CRITICAL": 3
+}
+
+
+# Rough per-event share of meta, identity and JSON punctuation
+EVENT_OVERHEAD_BYTES = 512
+
+
+def _severity_rank(event):
+    return SEVERITY_RANK.get(event.severity, 0)
+
+
+def estimate_size(event):
+    """Cheap upper-bound guess of an event's serialized size."""
+    size = EVENT_OVERHEAD_BYTES
+    for value in event.data.values():
+        if isinstance(value, str):
+            size += len(value)
+        elif isinstance(value, LazyStack):
+            size += value.size_hint()
+        else:
+            size += 8
+    return size
+
+
+class RingBuffer:
+    """
+    Fixed-capacity FIFO over a preallocated slot list.
+
+    When full, `push` applies the overflow policy and records the
+    type of every discarded event in `dropped`.
+    """
+
+    __slots__ = ("capacity", "dropped", "_slots", "_head", "_size")
+
+    def __init__(self, capacity):
+        if capacity < 1:
+            raise ValueError("queue capacity must be at least 1")
+
+        self.capacity = capacity
+        self.dropped = {}
+        self._slots = [None] * capacity
+        self._head = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def push(self, event, policy):
+        """Store `event`; returns True if the buffer grew by one."""
+
+        if self._size < self.capacity:
+            self._slots[(self._head + self._size) % self.capacity] = event
+            self._size += 1
+            return True
+
+        if policy == "drop_newest":
+            self.record_drop(event)
+            return False
+
+        if policy == "drop_lowest_severity":
+            index = self._find_lower_severity(_severity_rank(event))
+
+            if index is None:
+                self.record_drop(event)
+                return False
+
+            self.record_drop(self._slots[index])
+            self._remove_at(index)
+            self._slots[(self._head + self._size) % self.capacity] = event
+            self._size += 1
+            return False
+
+        # drop_oldest: overwrite the head slot
+        self.record_drop(self._slots[self._head])
+        self._slots[self._head] = event
+        self._head = (self._head + 1) % self.capacity
+        return False
+
+    def drain(self, limit=None):
+        slots = self._slots
+        capacity = self.capacity
+        count = self._size if limit is None else min(limit, self._size)
+        batch = []
+
+        for offset in range(count):
+            index = (self._head + offset) % capacity
+            batch.append(slots[index])
+            slots[index] = None
+
+        self._size -= count
+        self._head = (self._head + count) % capacity if self._size else 0
+        return batch
+
+    def take_drop_counts(self):
+        dropped = self.dropped
+        self.dropped = {}
+        return dropped
+
+    def record_drop(self, event):
+        event_type = event.event_type
+        self.dropped[event_type] = self.dropped.get(event_type, 0) + 1
+
+    def _find_lower_severity(self, rank):
+        # Oldest event with the lowest severity below `rank`
+        best_index = None
+        best_rank = rank
+
+        for offset in range(self._size):
+            index = (self._head + offset) % self.capacity
+            candidate = _severity_rank(self._slots[index])
+
+            if candidate < best_rank:
+                best_index = index
+                best_rank = candidate
+                if candidate == 0:
+                    break
+
+        return best_index
+
+    def _remove_at(self, index):
+        # Shift the older events one slot forward to close the gap
+        slots = self._slots
+        capacity = self.capacity
+
+        while index != self._head:
+            previous = (index - 1) % capacity
+            slots[index] = slots[previous]
+            index = previous
+
+        slots[self._head] = None
+        self._head = (self._head + 1) % capacity
+        self._size -= 1
+
+
+class _Shard:
+    """Per-thread buffer; its lock is only shared with the flusher."""
+
+    __slots__ = ("buffer", "lock", "thread")
+
+    def __init__(self, capacity):
+        self.buffer = RingBuffer(capacity)
+        self.lock = threading.Lock()
+        self.thread = threading.current_thread()
 
 
 class EventQueue:
 
-    _queue = []
+    _buffer = RingBuffer(AgentConfig.queue_capacity)
     _lock = threading.Lock()
 
+    # Express lane for urgent severities, guarded by _lock in both modes
+    _express = RingBuffer(AgentConfig.express_queue_capacity)
+    _express_first_at = None
+
+    # LOW events are dropped on arrival until then (collector pushing back)
+    _shed_until = 0.0
+
+    # Flush triggers, guarded by _lock (approximate in thread_local mode)
+    _ready = threading.Condition(_lock)
+    _pending_events = 0
+    _pending_bytes = 0
+    _first_event_at = None
+    _interrupted = False
+
+    # Called once by the first push (lazy sender start)
+    _start_hook = None
+
+    # Hands events to another process instead of buffering them (shm)
+    _transport = None
+
+    # thread_local mode
+    _local = threading.local()
+    _shards = []
+    _next_shard = 0
+    _retired_drops = {}
+
+    @classmethod
+    def configure(cls, capacity=None, policy=None, mode=None):
+
+        capacity = capacity or AgentConfig.queue_capacity
+        policy = policy or AgentConfig.overflow_policy
+        mode = mode or AgentConfig.queue_mode
+
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unsupported overflow policy: {policy}")
+
+        if mode not in QUEUE_MODES:
+            raise ValueError(f"Unsupported queue mode: {mode}")
+
+        pending = cls.flush()
+        dropped = cls.drop_stats()
+
+        AgentConfig.queue_capacity = capacity
+        AgentConfig.overflow_policy = policy
+        AgentConfig.queue_mode = mode
+
+        with cls._lock:
+            cls._buffer = RingBuffer(capacity)
+            cls._express = RingBuffer(AgentConfig.express_queue_capacity)
+            cls._express_first_at = None
+            cls._local = threading.local()
+            cls._shards = []
+            cls._retired_drops = dropped
+
+            for event in pending:
+                if cls._track(event, cls._buffer.push(event, policy)):
+                    cls._ready.notify()
+
     @classmethod
     def push(cls, event):
+
+        if cls._transport is not None:
+            cls._transport.push(event)
+            return
+
+        if cls._start_hook is not None:
+            cls._run_start_hook()
+
+        severity = event.severity
+
+        if severity in AgentConfig.express_severities and cls._push_express(event):
+            return
+
+        if AgentConfig.queue_mode == "shared":
+            with cls._lock:
+                if severity == "LOW" and cls._should_shed(cls._buffer):
+                    cls._buffer.record_drop(event)
+                    return
+
+                grew = cls._buffer.push(event, AgentConfig.overflow_policy)
+                if cls._track(event, grew):
+                    cls._ready.notify()
+            return
+
+        shard = getattr(cls._local, "shard", None)
+        if shard is None:
+            shard = cls._register_shard()
+
+        with shard.lock:
+            if severity == "LOW" and cls._should_shed(shard.buffer):
+                shard.buffer.record_drop(event)
+                return
+
+            grew = shard.buffer.push(event, AgentConfig.overflow_policy)
+
+        # Only take the shared lock when the flusher has to be woken
+        if cls._track(event, grew):
+            with cls._lock:
+                cls._ready.notify()
+
+    @classmethod
+    def _push_express(cls, event):
+        # Returns False when the lane is full; the event then takes the normal lane
         with cls._lock:
-            cls._queue.append(event)
+            if len(cls._express) >= cls._express.capacity:
+                return False
+
+            cls._express.push(event, "drop_newest")
+            notify = cls._track(event, True)
+
+            if cls._express_first_at is None:
+                cls._express_first_at = time.monotonic()
+                notify = True
+
+            if notify:
+                cls._ready.notify()
+
+        return True
+
+    @classmethod
+    def _should_shed(cls, buffer):
+        # LOW events go first: on a nearly full buffer or while the collector pushes back
+        watermark = AgentConfig.shed_low_watermark
+        if watermark is not None and len(buffer) >= buffer.capacity * watermark:
+            return True
+
+        return cls._shed_until > 0 and time.monotonic() < cls._shed_until
 
     @classmethod
-    def flush(cls):
+    def pressure(cls):
+        """How full the buffer is (0..1), 1.0 while the collector pushes back."""
+
+        if cls._shed_until > 0 and time.monotonic() < cls._shed_until:
+            return 1.0
+
+        # Unlocked reads: an approximate figure is all samplers need
+        if AgentConfig.queue_mode == "shared":
+            return len(cls._buffer) / cls._buffer.capacity
+
+        return max(
+            (len(shard.buffer) / shard.buffer.capacity for shard in cls._shards),
+            default=0.0
+        )
+
+    @classmethod
+    def shed_low_until(cls, deadline):
+        """Drop new LOW events until `deadline` (time.monotonic())."""
+        cls._shed_until = max(cls._shed_until, deadline)
+
+    @classmethod
+    def flush(cls, limit=None):
+
         with cls._lock:
-            batch = cls._queue[:]
-            cls._queue.clear()
+            # Urgent events lead the batch
+            batch = cls._express.drain(limit)
+            if not len(cls._express):
+                cls._express_first_at = None
+
+            batch.extend(cls._buffer.drain(
+                None if limit is None else limit - len(batch)
+            ))
+            shards = list(cls._shards)
+            start = cls._next_shard % len(shards) if shards else 0
+            cls._next_shard = start + 1
+
+        # Rotate the starting shard so capped flushes don't starve threads
+        for shard in shards[start:] + shards[:start]:
+            if limit is not None and len(batch) >= limit:
+                break
+
+            with shard.lock:
+                batch.extend(shard.buffer.drain(
+                    None if limit is None else limit - len(batch)
+                ))
+
+        cls._prune_shards()
+        cls._settle(batch)
         return batch
+
+    @classmethod
+    def wait_for_batch(cls, timeout=None):
+        """
+        Block until a batch is due: `batch_size` events or
+        `batch_max_bytes` are queued, or `flush_interval` has passed
+        since the first queued event (`express_flush_interval` for the
+        express lane). Sleeps indefinitely while idle unless `timeout`
+        is given; returns False if it expires first or `interrupt` is
+        called.
+        """
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        with cls._lock:
+            ready = cls._ready.wait_for(
+                lambda: cls._pending_events > 0 or cls._interrupted,
+                timeout
+            )
+
+            while ready and not cls._interrupted and not cls._batch_full():
+                now = time.monotonic()
+                remaining = cls._linger_remaining(now)
+                if remaining <= 0:
+                    break
+
+                if deadline is not None:
+                    if deadline <= now:
+                        ready = False
+                        break
+                    remaining = min(remaining, deadline - now)
+
+                cls._ready.wait(remaining)
+
+            if cls._interrupted:
+                cls._interrupted = False
+                return False
+
+        return ready
+
+    @classmethod
+    def _linger_remaining(cls, now):
+        remaining = []
+
+        if cls._first_event_at is not None:
+            remaining.append(cls._first_event_at + AgentConfig.flush_interval - now)
+        if cls._express_first_at is not None:
+            remaining.append(
+                cls._express_first_at + AgentConfig.express_flush_interval - now
+            )
+
+        return min(remaining) if remaining else 0.0
+
+    @classmethod
+    def interrupt(cls):
+        """Make a pending `wait_for_batch` return False right away."""
+        with cls._lock:
+            cls._interrupted = True
+            cls._ready.notify_all()
+
+    @classmethod
+    def drop_stats(cls):
+        """Per-type drop counts since the previous call."""
+
+        with cls._lock:
+            dropped = cls._retired_drops
+            cls._retired_drops = {}
+            _merge_counts(dropped, cls._buffer.take_drop_counts())
+            shards = list(cls._shards)
+
+        for shard in shards:
+            with shard.lock:
+                _merge_counts(dropped, shard.buffer.take_drop_counts())
+
+        return dropped
+
+    @classmethod
+    def set_transport(cls, transport):
+        cls._transport = transport
+
+    @classmethod
+    def set_start_hook(cls, hook):
+        with cls._lock:
+            cls._start_hook = hook
+
+    @classmethod
+    def _run_start_hook(cls):
+        with cls._lock:
+            hook, cls._start_hook = cls._start_hook, None
+
+        if hook is not None:
+            hook()
+
+    @classmethod
+    def reset_after_fork(cls):
+        """Drop events and locks inherited from the parent process."""
+        cls._lock = threading.Lock()
+        cls._ready = threading.Condition(cls._lock)
+        cls._buffer = RingBuffer(AgentConfig.queue_capacity)
+        cls._express = RingBuffer(AgentConfig.express_queue_capacity)
+        cls._express_first_at = None
+        cls._shed_until = 0.0
+        cls._pending_events = 0
+        cls._pending_bytes = 0
+        cls._first_event_at = None
+        cls._interrupted = False
+        cls._start_hook = None
+
+        if cls._transport is not None:
+            cls._transport.reset_after_fork()
+
+        cls._local = threading.local()
+        cls._shards = []
+        cls._next_shard = 0
+        cls._retired_drops = {}
+
+    @classmethod
+    def _track(cls, event, grew):
+        # Returns True when the flusher should be woken
+        events = cls._pending_events
+        size = cls._pending_bytes
+
+        if events == 0:
+            cls._first_event_at = time.monotonic()
+
+        cls._pending_events = events + grew
+        cls._pending_bytes = size + estimate_size(event)
+
+        return (
+            events == 0
+            or events < AgentConfig.batch_size <= cls._pending_events
+            or size < AgentConfig.batch_max_bytes <= cls._pending_bytes
+        )
+
+    @classmethod
+    def _batch_full(cls):
+        return (
+            cls._pending_events >= AgentConfig.batch_size
+            or cls._pending_bytes >= AgentConfig.batch_max_bytes
+        )
+
+    @classmethod
+    def _settle(cls, batch):
+        # Resynchronise the trigger counters after a flush
+        flushed_bytes = sum(estimate_size(event) for event in batch)
+
+        with cls._lock:
+            remaining = len(cls._buffer) + len(cls._express) + sum(
+                len(shard.buffer) for shard in cls._shards
+            )
+            cls._pending_events = remaining
+
+            if remaining:
+                cls._pending_bytes = max(0, cls._pending_bytes - flushed_bytes)
+            else:
+                cls._pending_bytes = 0
+                cls._first_event_at = None
+
+    @classmethod
+    def record_external_drops(cls, event_type, count):
+        """Account for events lost before they reached this queue."""
+        with cls._lock:
+            _merge_counts(cls._retired_drops, {event_type: count})
+
+    @classmethod
+    def _register_shard(cls):
+        shard = _Shard(AgentConfig.thread_buffer_capacity)
+
+        with cls._lock:
+            cls._shards.append(shard)
+
+        cls._local.shard = shard
+        return shard
+
+    @classmethod
+    def _prune_shards(cls):
+        # Forget buffers of finished threads once they are drained
+        with cls._lock:
+            live = []
+
+            for shard in cls._shards:
+                if shard.thread.is_alive() or len(shard.buffer):
+                    live.append(shard)
+                else:
+                    _merge_counts(
+                        cls._retired_drops,
+                        shard.buffer.take_drop_counts()
+                    )
+
+            cls._shards = live
+
+
+def _merge_counts(target, counts):
+    for key, value in counts.items():
+        target[key] = target.get(key, 0) + value
@@ -0,0 +1,150 @@
+import heapq
+import itertools
+import random
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+
+def decorrelated_jitter(previous, base, cap):
+    """Next backoff: uniform between `base` and 3x the previous one."""
+    return min(cap, random.uniform(base, max(base, previous) * 3))
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date)."""
+
+    if not value:
+        return None
+
+    value = value.strip()
+
+    if value.isdigit():
+        return float(value)
+
+    # HTTP-date form is rare; email.utils is slow to import at startup
+    from email.utils import parsedate_to_datetime
+
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def parse_credits(value):
+    """
+    Collector credits from an `X-Credits: events=N, bytes=N, reset=S`
+    header: what this API key may still send before the window resets
+    in S seconds. None when absent or malformed.
+    """
+
+    if not value:
+        return None
+
+    credits = {}
+
+    for item in value.split(","):
+        name, _, amount = item.strip().partition("=")
+        try:
+            credits[name.strip().lower()] = float(amount)
+        except ValueError:
+            return None
+
+    if "reset" not in credits:
+        return None
+
+    return credits
+
+
+class RetryBudget:
+    """
+    Caps retries to a fraction of all sends over a sliding window.
+
+    A retry is allowed while retries in the window stay below
+    `minimum + ratio * sends`, so a fleet hitting a broken collector
+    adds at most `ratio` extra load instead of multiplying it.
+    """
+
+    def __init__(self, ratio, minimum, window):
+        self.ratio = ratio
+        self.minimum = minimum
+        self.window = window
+
+        self._sends = deque()
+        self._retries = deque()
+
+    def record_send(self):
+        now = time.monotonic()
+        self._sends.append(now)
+        self._expire(now)
+
+    def try_retry(self):
+        now = time.monotonic()
+        self._expire(now)
+
+        if len(self._retries) >= self.minimum + self.ratio * len(self._sends):
+            return False
+
+        self._retries.append(now)
+        return True
+
+    def _expire(self, now):
+        horizon = now - self.window
+        for samples in (self._sends, self._retries):
+            while samples and samples[0] < horizon:
+                samples.popleft()
+
+
+class RetryScheduler:
+    """Delay queue of items waiting for their next attempt."""
+
+    def __init__(self):
+        self._heap = []
+        self._order = itertools.count()
+
+    def __len__(self):
+        return len(self._heap)
+
+    def schedule(self, item, delay):
+        due = time.monotonic() + delay
+        heapq.heappush(self._heap, (due, next(self._order), item))
+
+    def pop_due(self):
+        now = time.monotonic()
+        due = []
+
+        while self._heap and self._heap[0][0] <= now:
+            due.append(heapq.heappop(self._heap)[2])
+
+        return due
+
+    def pop_oldest(self):
+        """Remove the item scheduled first (used when the queue is full)."""
+        if not self._heap:
+            return None
+
+        oldest = min(range(len(self._heap)), key=lambda i: self._heap[i][1])
+        item = self._heap[oldest][2]
+
+        self._heap[oldest] = self._heap[-1]
+        self._heap.pop()
+        heapq.heapify(self._heap)
+
+        return item
+
+    def drain(self):
+        """Remove and return every item regardless of due time."""
+        items = [entry[2] for entry in sorted(self._heap)]
+        self._heap = []
+        return items
+
+    def next_delay(self):
+        """Seconds until the next item is due, or None when empty."""
+        if not self._heap:
+            return None
+        return max(0.0, self._heap[0][0] - time.monotonic())
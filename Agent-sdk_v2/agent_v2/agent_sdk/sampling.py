@@ -0,0 +1,89 @@
+import random
+import threading
+import time
+from .config import AgentConfig
+from .queue import EventQueue
+from .severity import get_severity
+from .stats import AgentStats
+
+
+class Sampler:
+    """
+    Head sampling, decided before an event is built.
+
+    Each event type is kept at its rate from AgentConfig.sample_rates
+    (sample_rate otherwise). Kept events record sample_weight = 1 / rate
+    in their metrics so the collector can extrapolate counts.
+
+    With adaptive_sampling, the rates of non-urgent events (severities
+    outside express_severities) are further scaled down while the event
+    buffer is above sampling_target_fill or the collector pushes back,
+    halving at most once per sampling_adjust_interval, and recover
+    gradually once pressure is gone.
+    """
+
+    RECOVERY_FACTOR = 1.25
+
+    # Skipped events are reported to AgentStats in groups of this many
+    STATS_EVERY = 256
+
+    _scale = 1.0
+    _skipped = 0   # unlocked, so approximate; cheaper than a stats call per event
+    _next_adjust = 0.0
+    _lock = threading.Lock()
+
+    @classmethod
+    def sample(cls, event_type, severity=None):
+        """Weight for a kept event, or None when it should be skipped."""
+
+        rate = AgentConfig.sample_rates.get(event_type, AgentConfig.sample_rate)
+
+        if AgentConfig.adaptive_sampling:
+            now = time.monotonic()
+            if now >= cls._next_adjust:
+                cls._adjust(now)
+
+            if (severity or get_severity(event_type)) not in AgentConfig.express_severities:
+                rate *= cls._scale
+
+        if rate >= 1.0:
+            return 1.0
+
+        if rate <= 0.0 or random.random() >= rate:
+            cls._skipped += 1
+            if cls._skipped >= cls.STATS_EVERY:
+                skipped, cls._skipped = cls._skipped, 0
+                AgentStats.incr("sampled_out_events", skipped)
+            return None
+
+        return 1.0 / rate
+
+    @classmethod
+    def _adjust(cls, now):
+
+        with cls._lock:
+            if now < cls._next_adjust:
+                return   # another thread just did it
+            cls._next_adjust = now + AgentConfig.sampling_adjust_interval
+
+            pressure = EventQueue.pressure()
+
+            if pressure > AgentConfig.sampling_target_fill:
+                cls._scale = max(AgentConfig.sampling_min_scale, cls._scale / 2)
+            elif pressure < AgentConfig.sampling_target_fill / 2:
+                cls._scale = min(1.0, cls._scale * cls.RECOVERY_FACTOR)
+
+            AgentStats.gauge("sampling_scale", round(cls._scale, 4))
+
+    @staticmethod
+    def validate(rates):
+        for event_type, rate in rates.items():
+            if not 0.0 <= rate <= 1.0:
+                raise ValueError(f"Unsupported sample rate for {event_type}: {rate}")
+
+    @classmethod
+    def reset_after_fork(cls):
+        cls._scale = 1.0
+        cls._skipped = 0
+        cls._next_adjust = 0.0
+        cls._lock = threading.Lock()
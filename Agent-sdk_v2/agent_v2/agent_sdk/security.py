@@ -1,13 +1,37 @@
 import hmac
 import hashlib
-import json
 
 
-def generate_signature(secret: str, timestamp: str, payload: dict) -> str:
-    message = timestamp + json.dumps(payload, sort_keys=True)
-    signature = hmac.new(
-        secret.encode(),
-        message.encode(),
-        hashlib.sha256
-    ).hexdigest()
-    return signature
+# v2 signs body + b"\n" + timestamp, so one batch's body is hashed once
+# and every attempt only adds its timestamp
+SIGNATURE_VERSION = "2"
+
+# Pre-keyed HMAC per secret; copies skip deriving the key pads again
+_keyed = {}
+
+
+def keyed_hmac(secret: str):
+    mac = _keyed.get(secret)
+    if mac is None:
+        mac = _keyed[secret] = hmac.new(secret.encode(), digestmod=hashlib.sha256)
+    return mac.copy()
+
+
+def sign_body(secret: str, chunks):
+    """HMAC state over the body chunks, reusable for every attempt."""
+    mac = keyed_hmac(secret)
+    for chunk in chunks:
+        mac.update(chunk)
+    mac.update(b"\n")
+    return mac
+
+
+def finish_signature(body_mac, timestamp: str) -> str:
+    mac = body_mac.copy()
+    mac.update(timestamp.encode())
+    return mac.hexdigest()
+
+
+def generate_signature(secret: str, timestamp: str, body: bytes) -> str:
+    # Signs the exact bytes sent (before Content-Encoding), whatever the format
+    return finish_signature(sign_body(secret, (body,)), timestamp)
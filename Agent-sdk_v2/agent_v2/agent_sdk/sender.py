@@ -1,91 +1,942 @@
+import atexit
 import threading
 import time
-import requests
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from .queue import EventQueue
 from .config import AgentConfig
-from .security import generate_signature
-import json
+from .security import SIGNATURE_VERSION, finish_signature, sign_body
+from .compression import available_encodings, compress, compressor, parse_accept_encoding
+from .stats import AgentStats
+from .spool import DiskSpool, claim_spool_dir
+from .wire import COLUMNAR_SCHEMA_VERSION, encode_events
+from .serializers import (
+    JSON, NDJSON, SERIALIZATIONS, available_content_types, ndjson_chunks, serialize
+)
+from .adaptive import AdaptiveController
+from .retry import (
+    RetryBudget, RetryScheduler, decorrelated_jitter, parse_credits, parse_retry_after
+)
 
 
 def current_utc():
     return datetime.now(timezone.utc).isoformat()
 
 
+class Batch:
+    """A flushed batch and its delivery state across attempts."""
+
+    __slots__ = (
+        "events", "batch_id", "replayed", "attempts", "backoff", "meta",
+        "payload", "body", "content_type", "body_mac", "dispatched_at"
+    )
+
+    def __init__(self, events, batch_id=None, replayed=False):
+        self.events = events
+        self.batch_id = batch_id or str(uuid.uuid4())
+        self.replayed = replayed
+        self.attempts = 0
+        self.backoff = 0.0
+        self.meta = None      # built once, on the first attempt
+        self.payload = None
+        self.body = None
+        self.content_type = None
+        self.body_mac = None   # body signed once; attempts add their timestamp
+        self.dispatched_at = None
+
+    @classmethod
+    def from_records(cls, records):
+        # IDs, timestamps and the event schema are built here, off the app threads
+        return cls([record.to_dict() for record in records])
+
+
 class Sender:
 
     RETRY_LIMIT = 5
     BASE_BACKOFF = 1  # seconds
+    MAX_BACKOFF = 60
+    MAX_RETRY_AFTER = 300
+
+    _session = None
+    _adapter = None
+    _session_lock = threading.Lock()   # workers may race to build the session
+    _accepted_encodings = None   # unknown until the collector says otherwise
+    _accepted_content_types = None
+
+    _spool = None
+    _spool_lock_file = None
+    _last_replay = 0.0
+    _replay_in_flight = False   # one at a time, so acks follow spool order
+    _replay_backoff = 0.0
+    _replay_after = 0.0         # no replay before this, after a failed one
+    _atexit_registered = False
+
+    _retries = RetryScheduler()
+    _budget = None
+    _hold_until = 0.0   # set from Retry-After; pauses every upload
+    _credits = None     # (events, bytes, expires_at) left per the collector
+
+    _controller = None   # AdaptiveController when adaptive_batching is on
+
+    # Upload workers; _state_lock guards the retry state they share
+    _workers = None
+    _state_lock = threading.Lock()
+    _in_flight = threading.Condition()
+    _in_flight_count = 0
+    _in_flight_bytes = 0
+
+    _started = False
+    _thread = None
+
+    @staticmethod
+    def start(lazy=False):
+        """
+        Start the background sender. With `lazy`, the thread, upload
+        pool and spool are only created when the first event is queued.
+        """
+
+        Sender._started = True
+
+        if lazy:
+            EventQueue.set_start_hook(Sender._start_thread)
+        else:
+            Sender._start_thread()
+
+    @staticmethod
+    def _start_thread():
+
+        Sender._budget = RetryBudget(
+            ratio=AgentConfig.retry_budget_ratio,
+            minimum=AgentConfig.retry_budget_min,
+            window=AgentConfig.retry_budget_window
+        )
+
+        if AgentConfig.spool_dir and Sender._spool is None:
+            # Each process locks its own slot, so forked workers never share segments
+            directory, Sender._spool_lock_file = claim_spool_dir(AgentConfig.spool_dir)
+            Sender._spool = DiskSpool(
+                directory,
+                max_bytes=AgentConfig.spool_max_bytes,
+                segment_bytes=AgentConfig.spool_segment_bytes
+            )
+
+            if not Sender._atexit_registered:
+                atexit.register(Sender._spool_pending)
+                Sender._atexit_registered = True
+
+        workers = AgentConfig.max_in_flight
+
+        if AgentConfig.adaptive_batching:
+            Sender._controller = AdaptiveController()
+            # Concurrency moves below this; _acquire_slot enforces it
+            workers = AgentConfig.adaptive_concurrency_max
+
+        if Sender._spool is not None:
+            workers += 1   # spool replay runs beside the live uploads
+
+        Sender._workers = ThreadPoolExecutor(
+            max_workers=workers,
+            thread_name_prefix="agent-sdk-upload"
+        )
+
+        Sender._thread = threading.Thread(target=Sender._run, daemon=True)
+        Sender._thread.start()
 
     @staticmethod
-    def start():
-        thread = threading.Thread(target=Sender._run, daemon=True)
-        thread.start()
+    def _reset_after_fork():
+        # The child inherits the parent's state but none of its threads
+        if Sender._spool is not None:
+            Sender._spool.abandon_after_fork()   # never take inherited locks here
+        if Sender._spool_lock_file is not None:
+            Sender._spool_lock_file.close()   # the parent keeps its lock
+
+        Sender._spool = None
+        Sender._spool_lock_file = None
+        Sender._session = None
+        Sender._adapter = None
+        Sender._session_lock = threading.Lock()
+        Sender._workers = None
+        Sender._thread = None
+        Sender._controller = None
+
+        Sender._retries = RetryScheduler()
+        Sender._hold_until = 0.0
+        Sender._credits = None
+        Sender._replay_in_flight = False
+        Sender._replay_backoff = 0.0
+        Sender._replay_after = 0.0
+        Sender._state_lock = threading.Lock()
+        Sender._in_flight = threading.Condition()
+        Sender._in_flight_count = 0
+        Sender._in_flight_bytes = 0
+
+        if Sender._started:
+            Sender.start(lazy=AgentConfig.lazy_start)
 
     @staticmethod
     def _run():
+        # Errors are contained per batch: the dispatcher must outlive any event
         while True:
-            time.sleep(5)
+            try:
+                wakeup = Sender._next_wakeup()
+            except Exception:
+                AgentStats.incr("sender_errors")
+                wakeup = 1.0
+
+            if EventQueue.wait_for_batch(wakeup):
+                events = EventQueue.flush(limit=AgentConfig.batch_size)
+                if events:
+                    Sender._dispatch(lambda: Sender._send(Batch.from_records(events)))
+
+            with Sender._state_lock:
+                due = Sender._retries.pop_due()
 
-            batch = EventQueue.flush()
-            if not batch:
-                continue
+            for batch in due:
+                Sender._dispatch(lambda: Sender._send(batch))
 
-            Sender._send_with_retry(batch)
+            Sender._dispatch(Sender._replay_spool)
 
     @staticmethod
-    def _send_with_retry(batch):
+    def _dispatch(step):
+        try:
+            step()
+        except Exception:
+            # e.g. an event that can't be serialized; its batch is lost
+            AgentStats.incr("sender_errors")
 
-        if not AgentConfig.api_secret:
+    @staticmethod
+    def _next_wakeup():
+        # Seconds until a retry or spool replay is due; None sleeps until events arrive
+        delays = []
+
+        with Sender._state_lock:
+            retry_delay = Sender._retries.next_delay()
+        if retry_delay is not None:
+            delays.append(retry_delay)
+
+        if Sender._spool and not Sender._replay_in_flight:
+            # Replay also waits out a Retry-After hold and a failed replay's backoff
+            next_replay = max(
+                Sender._last_replay + 1 / AgentConfig.spool_replay_rate,
+                Sender._replay_after,
+                Sender._hold_until
+            )
+            delays.append(max(0.0, next_replay - time.monotonic()))
+
+        return min(delays) if delays else None
+
+    @staticmethod
+    def _send(batch):
+
+        hold = max(
+            Sender._hold_until - time.monotonic(),
+            Sender._credit_wait(batch)
+        )
+        if hold > 0:
+            # The collector asked us to back off; this isn't a failed attempt
+            EventQueue.shed_low_until(time.monotonic() + hold)
+            with Sender._state_lock:
+                Sender._defer(batch, hold)
             return
 
-        payload = {
-            "batch_meta": {
-                "sdk_version": AgentConfig.sdk_version,
-                "schema_version": AgentConfig.schema_version,
-                "sent_at": current_utc(),
-                "event_count": len(batch),
-                "project": AgentConfig.project,
-                "environment": AgentConfig.environment
-            },
-            "events": batch
-        }
+        if Sender._workers is None:
+            Sender._upload(batch, 0)
+            return
+
+        if Sender._should_stream(batch):
+            # Only about one chunk of a streamed body is in memory at a time
+            size = AgentConfig.stream_chunk_bytes
+        else:
+            if batch.body is None:
+                Sender._serialize(batch)
+            size = len(batch.body)
+
+        batch.dispatched_at = time.monotonic()
+
+        Sender._acquire_slot(size)
+        Sender._workers.submit(Sender._upload, batch, size)
+
+    @staticmethod
+    def _upload(batch, size):
+
+        try:
+            if batch.dispatched_at is not None:
+                queued_ms = (time.monotonic() - batch.dispatched_at) * 1000
+                AgentStats.incr("upload_queue_ms", int(queued_ms))
+            AgentStats.incr("uploads_started")
+
+            if Sender._budget is not None:
+                with Sender._state_lock:
+                    Sender._budget.record_send()
+
+            started = time.monotonic()
+            accepted, retry_after = Sender._attempt(batch)
+
+            if Sender._controller is not None:
+                Sender._controller.record(
+                    time.monotonic() - started, accepted, retry_after is not None,
+                    Sender._fill(batch)
+                )
+
+            if not accepted:
+                with Sender._state_lock:
+                    Sender._retry_later(batch, retry_after)
+
+                # Let the dispatcher recompute its wake-up for the new retry
+                EventQueue.interrupt()
+
+            elif Sender._replay_after:
+                # The collector is back: resume spool replay right away
+                with Sender._state_lock:
+                    Sender._replay_backoff = 0.0
+                    Sender._replay_after = 0.0
+                EventQueue.interrupt()
+
+        except Exception:
+            AgentStats.incr("sender_errors")
+
+        finally:
+            if size:
+                Sender._release_slot(size)
+
+    @staticmethod
+    def _fill(batch):
+        # How close the batch came to the event or byte limit that flushes it
+        fill = len(batch.events) / AgentConfig.batch_size
+        if batch.body is not None:
+            fill = max(fill, len(batch.body) / AgentConfig.batch_max_bytes)
+        return fill
+
+    @staticmethod
+    def _acquire_slot(size):
+        # Blocks the dispatcher while max_in_flight / max_in_flight_bytes are used up
+        started = time.monotonic()
+
+        with Sender._in_flight:
+            Sender._in_flight.wait_for(
+                lambda: Sender._in_flight_count == 0 or (
+                    Sender._in_flight_count < AgentConfig.max_in_flight
+                    and Sender._in_flight_bytes + size <= AgentConfig.max_in_flight_bytes
+                )
+            )
+            Sender._in_flight_count += 1
+            Sender._in_flight_bytes += size
+
+            AgentStats.peak("uploads_in_flight_peak", Sender._in_flight_count)
+            AgentStats.peak("upload_bytes_in_flight_peak", Sender._in_flight_bytes)
+
+        AgentStats.incr("upload_slot_wait_ms", int((time.monotonic() - started) * 1000))
+
+    @staticmethod
+    def _release_slot(size):
+        with Sender._in_flight:
+            Sender._in_flight_count -= 1
+            Sender._in_flight_bytes -= size
+            Sender._in_flight.notify_all()
+
+    @staticmethod
+    def _retry_later(batch, retry_after):
+
+        batch.attempts += 1
+
+        if batch.attempts >= Sender.RETRY_LIMIT:
+            AgentStats.incr("retries_exhausted")
+            Sender._give_up(batch)
+            return
+
+        if Sender._budget is not None and not Sender._budget.try_retry():
+            AgentStats.incr("retry_budget_exhausted")
+            Sender._give_up(batch)
+            return
+
+        batch.backoff = decorrelated_jitter(
+            batch.backoff, Sender.BASE_BACKOFF, Sender.MAX_BACKOFF
+        )
+        delay = batch.backoff
+
+        if retry_after is not None:
+            retry_after = min(retry_after, Sender.MAX_RETRY_AFTER)
+            Sender._hold_until = time.monotonic() + retry_after
+            EventQueue.shed_low_until(Sender._hold_until)
+            delay = max(delay, retry_after)
 
-        # Stable JSON body
-        body = json.dumps(payload, separators=(",", ":"), sort_keys=True)
+        AgentStats.incr("retries_scheduled")
+        Sender._defer(batch, delay)
 
-        attempt = 0
+    @staticmethod
+    def _defer(batch, delay):
+        if len(Sender._retries) >= AgentConfig.retry_queue_limit:
+            Sender._give_up(Sender._retries.pop_oldest())
+
+        Sender._retries.schedule(batch, delay)
+
+    @staticmethod
+    def _give_up(batch):
+        if Sender._spool is not None and not batch.replayed:
+            Sender._spool_batch(batch)
+        else:
+            AgentStats.incr("dropped_batches")
+
+    @staticmethod
+    def _attempt(batch):
+        """
+        One upload attempt. Returns (accepted, retry_after) where
+        retry_after is the collector's Retry-After in seconds, if any.
+
+        Only 2xx is accepted; 408, 429 and 5xx are worth a retry. Other
+        4xx answers are final: the batch counts as rejected_batches and
+        is reported as accepted so it's neither retried nor spooled.
+        """
+
+        if not AgentConfig.api_secret:
+            return True, None
+
+        if Sender._should_stream(batch):
+            result = Sender._attempt_streaming(batch)
+            if result is not None:
+                return result
+            # The collector doesn't take NDJSON; fall back to a single body
+
+        if batch.body is None:
+            Sender._serialize(batch)
+
+        data, encoding = Sender._encode_body(batch.body)
 
-        while attempt < Sender.RETRY_LIMIT:
+        while True:
             try:
                 timestamp = current_utc()
 
-                signature = generate_signature(
-                    AgentConfig.api_secret,
-                    timestamp,
-                    body
-                )
+                if batch.body_mac is None:
+                    batch.body_mac = sign_body(AgentConfig.api_secret, (batch.body,))
+
+                headers = {
+                    "X-API-KEY": AgentConfig.api_key,
+                    "X-TIMESTAMP": timestamp,
+                    "X-SIGNATURE": finish_signature(batch.body_mac, timestamp),
+                    "X-SIGNATURE-VERSION": SIGNATURE_VERSION,
+                    "Content-Type": batch.content_type
+                }
+
+                if encoding:
+                    headers["Content-Encoding"] = encoding
+
+                response = Sender._post(data, headers)
+                Sender._note_accepted_content_types(response, batch.content_type)
+                Sender._note_accepted_encodings(response)
+
+                if response.status_code == 415:
+                    # Collector can't read this format or coding; resend with ones it accepts
+                    sent = (batch.content_type, encoding)
+
+                    if Sender._pick_content_type() != batch.content_type:
+                        Sender._serialize(batch)
+
+                    data, encoding = Sender._encode_body(batch.body)
+
+                    if (batch.content_type, encoding) != sent:
+                        continue
+
+                return Sender._outcome(response)
+
+            except Exception:
+                return False, None
+
+    @staticmethod
+    def _attempt_streaming(batch):
+        """
+        `_attempt` for a chunked NDJSON upload; None if the collector
+        turned NDJSON down.
+        """
+
+        if batch.content_type != NDJSON or batch.body_mac is None:
+            # First pass signs the stream; each attempt then regenerates it
+            batch.body = None
+            batch.content_type = NDJSON
+            batch.body_mac = sign_body(
+                AgentConfig.api_secret, Sender._stream_chunks(batch)
+            )
+
+        encoding = Sender._pick_encoding()
+
+        while True:
+            try:
+                timestamp = current_utc()
 
                 headers = {
                     "X-API-KEY": AgentConfig.api_key,
                     "X-TIMESTAMP": timestamp,
-                    "X-SIGNATURE": signature,
-                    "Content-Type": "application/json"
+                    "X-SIGNATURE": finish_signature(batch.body_mac, timestamp),
+                    "X-SIGNATURE-VERSION": SIGNATURE_VERSION,
+                    "Content-Type": NDJSON
                 }
 
-                response = requests.post(
-                    AgentConfig.endpoint,
-                    data=body,
-                    headers=headers,
-                    timeout=3
+                if encoding:
+                    headers["Content-Encoding"] = encoding
+
+                response = Sender._post(Sender._encoded_stream(batch, encoding), headers)
+                Sender._note_accepted_content_types(response, NDJSON)
+                Sender._note_accepted_encodings(response)
+
+                if response.status_code == 415:
+                    if not Sender._should_stream(batch):
+                        return None
+
+                    sent, encoding = encoding, Sender._pick_encoding()
+                    if encoding != sent:
+                        continue
+
+                return Sender._outcome(response)
+
+            except Exception:
+                return False, None
+
+    @staticmethod
+    def _outcome(response):
+
+        Sender._note_credits(response)
+        status = response.status_code
+
+        if 200 <= status < 300:
+            return True, None
+
+        if status in (408, 429) or status >= 500:
+            return False, parse_retry_after(response.headers.get("Retry-After"))
+
+        # Any other 4xx won't succeed on a resend
+        AgentStats.incr("rejected_batches")
+        return True, None
+
+    # ----------------------------
+    # Collector credits
+    # ----------------------------
+    @staticmethod
+    def _note_credits(response):
+        credits = parse_credits(response.headers.get("X-Credits"))
+
+        if credits is not None:
+            Sender._credits = (
+                credits.get("events"),
+                credits.get("bytes"),
+                time.monotonic() + credits["reset"]
+            )
+
+    @staticmethod
+    def _credit_wait(batch):
+        # Seconds until the collector's window resets, if the batch won't fit now
+        credits = Sender._credits
+        if credits is None:
+            return 0.0
+
+        events, size, expires_at = credits
+        wait = expires_at - time.monotonic()
+
+        if wait <= 0:
+            Sender._credits = None
+            return 0.0
+
+        if events is not None and len(batch.events) > events:
+            return wait
+        if size is not None and batch.body is not None and len(batch.body) > size:
+            return wait
+
+        return 0.0
+
+    @staticmethod
+    def _serialize(batch):
+        """Encode the batch in the preferred format the collector accepts."""
+
+        if batch.payload is None:
+            batch.payload = Sender._build_payload(batch)
+
+        batch.content_type = Sender._pick_content_type()
+        batch.body_mac = None
+
+        try:
+            batch.body = serialize(batch.payload, batch.content_type)
+        except (TypeError, OverflowError):
+            if batch.content_type == JSON:
+                raise
+            # msgpack can't pack it (e.g. ints beyond 64 bits); JSON can
+            batch.content_type = JSON
+            batch.body = serialize(batch.payload, JSON)
+
+    @staticmethod
+    def _build_payload(batch):
+
+        columns = None
+        if AgentConfig.batch_schema_version == COLUMNAR_SCHEMA_VERSION:
+            columns = encode_events(batch.events)
+
+        payload = {
+            "batch_meta": Sender._batch_meta(
+                batch,
+                COLUMNAR_SCHEMA_VERSION if columns is not None
+                else AgentConfig.schema_version
+            )
+        }
+
+        if columns is not None:
+            payload.update(columns)
+        else:
+            payload["events"] = batch.events
+
+        return payload
+
+    @staticmethod
+    def _batch_meta(batch, schema_version):
+
+        # Drop counts and agent stats are handed over exactly once per batch
+        if batch.meta is None:
+            batch.meta = {
+                "sdk_version": AgentConfig.sdk_version,
+                "batch_id": batch.batch_id,
+                "replayed": batch.replayed,
+                "sent_at": current_utc(),
+                "event_count": len(batch.events),
+                "project": AgentConfig.project,
+                "environment": AgentConfig.environment,
+                "dropped_events": EventQueue.drop_stats(),
+                "agent_stats": AgentStats.snapshot()
+            }
+
+        return dict(batch.meta, schema_version=schema_version)
+
+    # ----------------------------
+    # Streaming upload
+    # ----------------------------
+    @staticmethod
+    def _should_stream(batch):
+
+        threshold = AgentConfig.stream_min_events
+        if threshold is None or len(batch.events) < threshold:
+            return False
+
+        accepted = Sender._accepted_content_types
+        return accepted is None or NDJSON in accepted
+
+    @staticmethod
+    def _stream_chunks(batch):
+        # NDJSON lines grouped into ~stream_chunk_bytes chunks
+        return ndjson_chunks(
+            Sender._batch_meta(batch, AgentConfig.schema_version),
+            batch.events,
+            AgentConfig.stream_chunk_bytes
+        )
+
+    @staticmethod
+    def _encoded_stream(batch, encoding):
+
+        if encoding is None:
+            yield from Sender._stream_chunks(batch)
+            return
+
+        stream = compressor(encoding, AgentConfig.compression_level)
+
+        for chunk in Sender._stream_chunks(batch):
+            data = stream.compress(chunk)
+
+            AgentStats.incr("bytes_uncompressed", len(chunk))
+            AgentStats.incr("bytes_compressed", len(data))
+
+            # An empty chunk would end a chunked transfer early
+            if data:
+                yield data
+
+        data = stream.flush()
+        AgentStats.incr("bytes_compressed", len(data))
+        if data:
+            yield data
+
+    # ----------------------------
+    # Disk spool
+    # ----------------------------
+    @staticmethod
+    def _spool_batch(batch):
+        try:
+            dropped = Sender._spool.append({
+                "batch_id": batch.batch_id,
+                "events": batch.events
+            })
+            AgentStats.incr("spooled_batches")
+            if dropped:
+                AgentStats.incr("spool_segments_dropped", dropped)
+        except Exception:
+            AgentStats.incr("spool_write_errors")
+
+    @staticmethod
+    def _replay_spool():
+        """
+        Start one single-attempt replay, at most spool_replay_rate/s.
+
+        Replays run on the upload pool one at a time, so acks follow
+        spool order. Each is charged to the retry budget; after a failed
+        one, replay backs off (decorrelated jitter, or Retry-After) until
+        the backoff expires or a live upload is accepted.
+        """
+
+        spool = Sender._spool
+        if not spool or Sender._replay_in_flight:
+            return
+
+        now = time.monotonic()
+        if now < max(Sender._hold_until, Sender._replay_after):
+            return
+        if now - Sender._last_replay < 1 / AgentConfig.spool_replay_rate:
+            return
+        Sender._last_replay = now
+
+        entry = spool.peek()
+        if entry is None:
+            return
+
+        position, record = entry
+        batch = Batch(record["events"], record["batch_id"], replayed=True)
+
+        if Sender._credit_wait(batch) > 0:
+            return
+
+        if Sender._budget is not None:
+            with Sender._state_lock:
+                allowed = Sender._budget.try_retry()
+            if not allowed:
+                AgentStats.incr("replay_budget_exhausted")
+                return
+
+        Sender._replay_in_flight = True
+
+        if Sender._workers is None:
+            Sender._replay(spool, batch, position)
+        else:
+            Sender._workers.submit(Sender._replay, spool, batch, position)
+
+    @staticmethod
+    def _replay(spool, batch, position):
+
+        try:
+            accepted, retry_after = Sender._attempt(batch)
+
+            if accepted:
+                spool.ack(position)
+                AgentStats.incr("replayed_batches")
+
+                with Sender._state_lock:
+                    Sender._replay_backoff = 0.0
+                    Sender._replay_after = 0.0
+                return
+
+            AgentStats.incr("replay_failures")
+
+            with Sender._state_lock:
+                Sender._replay_backoff = decorrelated_jitter(
+                    Sender._replay_backoff, Sender.BASE_BACKOFF, Sender.MAX_BACKOFF
                 )
+                delay = Sender._replay_backoff
+
+                if retry_after is not None:
+                    retry_after = min(retry_after, Sender.MAX_RETRY_AFTER)
+                    Sender._hold_until = max(
+                        Sender._hold_until, time.monotonic() + retry_after
+                    )
+                    delay = max(delay, retry_after)
+
+                Sender._replay_after = time.monotonic() + delay
+
+        finally:
+            Sender._replay_in_flight = False
+            # Let the dispatcher schedule the next replay
+            EventQueue.interrupt()
 
-                if response.status_code < 500:
-                    return
+    @staticmethod
+    def drain(timeout):
+        """
+        Upload what's still in memory before the process exits: queued
+        events and pending retries get one attempt each, for up to
+        `timeout` seconds. Whatever isn't accepted is spooled when a
+        spool is configured, and dropped otherwise.
+        """
+
+        deadline = time.monotonic() + timeout
+
+        with Sender._state_lock:
+            pending = Sender._retries.drain()
+
+        while time.monotonic() < deadline:
+            if pending:
+                batch = pending.pop()
+            else:
+                events = EventQueue.flush(limit=AgentConfig.batch_size)
+                if not events:
+                    break
+                batch = Batch.from_records(events)
 
+            try:
+                accepted, _ = Sender._attempt(batch)
             except Exception:
-                pass
+                AgentStats.incr("sender_errors")
+                accepted = False
+
+            if not accepted:
+                Sender._give_up(batch)
+
+        for batch in pending:
+            Sender._give_up(batch)
+
+        # Uploads already handed to the pool finish (or fail into retries) first
+        with Sender._in_flight:
+            Sender._in_flight.wait_for(
+                lambda: Sender._in_flight_count == 0,
+                timeout=max(0.0, deadline - time.monotonic())
+            )
+
+        if Sender._spool is not None:
+            Sender._spool_pending()
+
+    @staticmethod
+    def _spool_pending():
+        # atexit: keep events still in memory across the restart
+        with Sender._state_lock:
+            pending = Sender._retries.drain()
+
+        for batch in pending:
+            Sender._spool_batch(batch)
+
+        while True:
+            events = EventQueue.flush(limit=AgentConfig.batch_size)
+            if not events:
+                return
+            Sender._spool_batch(Batch.from_records(events))
+
+    @staticmethod
+    def _encode_body(raw):
+
+        encoding = Sender._pick_encoding()
+
+        if encoding is None or len(raw) < AgentConfig.compression_min_bytes:
+            return raw, None
+
+        data = compress(raw, encoding, AgentConfig.compression_level)
+
+        AgentStats.incr("bytes_uncompressed", len(raw))
+        AgentStats.incr("bytes_compressed", len(data))
+
+        return data, encoding
+
+    @staticmethod
+    def _pick_encoding():
+
+        if not AgentConfig.compression:
+            return None
+
+        available = available_encodings()
+        accepted = Sender._accepted_encodings
+
+        for encoding in [AgentConfig.compression] + available:
+            if encoding in available and (accepted is None or encoding in accepted):
+                return encoding
+
+        return None
+
+    @staticmethod
+    def _pick_content_type():
+
+        available = available_content_types()
+        accepted = Sender._accepted_content_types
+        preference = AgentConfig.serialization
+
+        if preference not in SERIALIZATIONS:
+            raise ValueError(f"Unsupported serialization: {preference}")
+
+        if preference == "json":
+            return JSON
+
+        for content_type in available:
+            if accepted is None:
+                # "auto" waits until the collector advertises anything beyond JSON
+                if preference == "msgpack" or content_type == JSON:
+                    return content_type
+            elif content_type in accepted:
+                return content_type
+
+        return JSON
+
+    @staticmethod
+    def _note_accepted_content_types(response, sent):
+        # Collectors list the body formats they read in Accept-Post
+        header = response.headers.get("Accept-Post")
+
+        if header is not None:
+            Sender._accepted_content_types = parse_accept_encoding(header)
+        elif response.status_code == 415 and sent != JSON:
+            Sender._accepted_content_types = [JSON]
+
+    @staticmethod
+    def _note_accepted_encodings(response):
+        # RFC 7694: collectors advertise request codings via Accept-Encoding
+        header = response.headers.get("Accept-Encoding")
+
+        if header is not None:
+            Sender._accepted_encodings = parse_accept_encoding(header)
+        elif response.status_code == 415:
+            Sender._accepted_encodings = []
+
+    @staticmethod
+    def _get_session():
+        """Long-lived keep-alive session used for every upload."""
+
+        if Sender._session is not None:
+            return Sender._session
+
+        with Sender._session_lock:
+            if Sender._session is None:
+                Sender._build_session()
+
+        return Sender._session
+
+    @staticmethod
+    def _build_session():
+        # Imported here so a lazily started agent doesn't pay for it at init
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=max(
+                AgentConfig.http_pool_size,
+                AgentConfig.max_in_flight,
+                AgentConfig.adaptive_concurrency_max if AgentConfig.adaptive_batching else 0
+            )
+        )
+
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+
+        # Skipped by the outgoing HTTP instrumentation
+        session._agent_internal = True
+
+        Sender._adapter = adapter
+        Sender._session = session
+
+    @staticmethod
+    def _post(body, headers):
+
+        session = Sender._get_session()
+        pool = Sender._adapter.poolmanager.connection_from_url(
+            AgentConfig.endpoint
+        )
+        opened_before = pool.num_connections
+
+        try:
+            return session.post(
+                AgentConfig.endpoint,
+                data=body,
+                headers=headers,
+                timeout=AgentConfig.http_timeout
+            )
+        finally:
+            opened = pool.num_connections - opened_before
 
-            backoff_time = Sender.BASE_BACKOFF * (2 ** attempt)
-            time.sleep(backoff_time)
-            attempt += 1
+            AgentStats.incr("http_requests")
+            AgentStats.incr("http_connections_opened", opened)
+            AgentStats.incr("http_connections_reused", 1 - min(opened, 1))
@@ -0,0 +1,64 @@
+import json
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional dependency
+    msgpack = None
+
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+
+# Streamed batches: a batch_meta line, then one JSON event per line
+NDJSON = "application/x-ndjson"
+
+SERIALIZATIONS = ("auto", "json", "msgpack")
+
+
+def available_content_types():
+    """Body formats this SDK can produce, in order of preference."""
+    content_types = [JSON]
+    if msgpack is not None:
+        content_types.insert(0, MSGPACK)
+    return content_types
+
+
+def serialize(payload, content_type: str) -> bytes:
+
+    if content_type == JSON:
+        if orjson is not None:
+            try:
+                return orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)
+            except TypeError:   # e.g. ints beyond 64 bits
+                pass
+
+        return json.dumps(payload, separators=(",", ":"), sort_keys=True).encode()
+
+    if content_type == MSGPACK and msgpack is not None:
+        return msgpack.packb(payload, use_bin_type=True)
+
+    raise ValueError(f"Unsupported content type: {content_type}")
+
+
+def ndjson_chunks(meta, events, chunk_bytes):
+    """NDJSON lines of one batch (batch_meta first), in ~chunk_bytes chunks."""
+    lines = [serialize({"batch_meta": meta}, JSON) + b"\n"]
+    size = len(lines[0])
+
+    for event in events:
+        line = serialize(event, JSON) + b"\n"
+        lines.append(line)
+        size += len(line)
+
+        if size >= chunk_bytes:
+            yield b"".join(lines)
+            lines = []
+            size = 0
+
+    if lines:
+        yield b"".join(lines)
@@ -0,0 +1,97 @@
+"""
+Per-host shipper for the shm transport.
+
+Application processes started with `Agent.init(transport="shm")` write
+events into a shared-memory ring; this process drains the ring and
+runs the normal Sender pipeline (batching, compression, signing,
+retries, spool) once for the whole host.
+
+    agent-sdk-shipper --endpoint https://collector/api/logs \\
+        --api-key KEY --project my-app
+
+The API secret is read from --api-secret or AGENT_API_SECRET.
+"""
+import argparse
+import marshal
+import os
+import signal
+import time
+
+from .config import AgentConfig
+from .event_builder import EventRecord
+from .queue import EventQueue
+from .sender import Sender
+from .shm import SharedRing
+
+
+# Seconds to upload (or spool) events already taken from the ring on shutdown
+SHUTDOWN_DRAIN_SECONDS = 10
+
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="agent-sdk-shipper")
+    parser.add_argument("--endpoint", required=True)
+    parser.add_argument("--api-key", required=True)
+    parser.add_argument("--api-secret", default=os.environ.get("AGENT_API_SECRET"))
+    parser.add_argument("--project", required=True)
+    parser.add_argument("--environment", default=AgentConfig.environment)
+    parser.add_argument("--shm-name", default=AgentConfig.shm_name)
+    parser.add_argument("--shm-size", type=int, default=AgentConfig.shm_size)
+    parser.add_argument("--poll-interval", type=float, default=AgentConfig.shm_poll_interval)
+    parser.add_argument("--compression", default=AgentConfig.compression)
+    parser.add_argument("--spool-dir", default=AgentConfig.spool_dir)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = _parse_args(argv)
+
+    if not args.api_secret:
+        raise SystemExit("agent-sdk-shipper: --api-secret or AGENT_API_SECRET is required")
+
+    AgentConfig.endpoint = args.endpoint
+    AgentConfig.api_key = args.api_key
+    AgentConfig.api_secret = args.api_secret
+    AgentConfig.project = args.project
+    AgentConfig.environment = args.environment
+    AgentConfig.compression = args.compression
+    AgentConfig.spool_dir = args.spool_dir
+
+    ring = SharedRing.create(args.shm_name, args.shm_size)
+    Sender.start()
+
+    running = True
+
+    def _stop(signum, frame):
+        nonlocal running
+        running = False
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    try:
+        while running:
+            records = ring.pop_all(max_bytes=AgentConfig.batch_max_bytes)
+
+            for record in records:
+                try:
+                    EventQueue.push(EventRecord.from_tuple(marshal.loads(record)))
+                except (ValueError, EOFError, TypeError):
+                    pass
+
+            dropped = ring.take_dropped()
+            if dropped:
+                EventQueue.record_external_drops("SHM_RING", dropped)
+
+            if not records:
+                time.sleep(args.poll_interval)
+    finally:
+        # Events already popped are gone from the ring: send or spool them
+        Sender.drain(SHUTDOWN_DRAIN_SECONDS)
+
+        # Anything still in the ring stays there for the next shipper
+        ring.close()
+
+
+if __name__ == "__main__":
+    main()
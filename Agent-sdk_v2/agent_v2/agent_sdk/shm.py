@@ -0,0 +1,307 @@
+import marshal
+import os
+import struct
+import tempfile
+import threading
+import time
+from multiprocessing import shared_memory
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+MAGIC = b"AGSR"
+VERSION = 1
+
+# magic, version, capacity, head, tail, dropped
+HEADER = struct.Struct("<4sIQQQQ")
+HEADER_SIZE = 64
+
+LENGTH = struct.Struct("<I")
+WRAP_MARKER = 0xFFFFFFFF
+
+
+def _lock_path(name):
+    return os.path.join(tempfile.gettempdir(), f"{name}.lock")
+
+
+def _open(name, create=False, size=0):
+    # No process may unlink the segment on exit: the ring outlives
+    # app workers and shipper restarts alike
+    try:
+        return shared_memory.SharedMemory(
+            name=name, create=create, size=size, track=False
+        )
+    except TypeError:  # Python < 3.13
+        from multiprocessing import resource_tracker
+        shm = shared_memory.SharedMemory(name=name, create=create, size=size)
+        try:
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+        return shm
+
+
+class SharedRing:
+    """
+    Multi-process byte ring in `multiprocessing.shared_memory`.
+
+    Records are length-prefixed and never split across the end of the
+    buffer: a wrap marker (or a short tail) sends readers back to
+    offset 0. `head` and `tail` are ever-growing byte counters, so
+    `head - tail` is the space in use. Writers and the reader serialise
+    on an flock'd lock file (plus a thread lock within each process).
+    A full ring drops the new record and counts it in `dropped`.
+    """
+
+    def __init__(self, shm):
+        if fcntl is None:
+            raise RuntimeError("The shm transport requires a POSIX platform")
+
+        self._shm = shm
+        self._buf = shm.buf
+        self._thread_lock = threading.Lock()
+        self._lock_file = open(_lock_path(shm.name.lstrip("/")), "a")
+
+        magic, version, capacity, _, _, _ = HEADER.unpack_from(self._buf, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{shm.name} is not an agent event ring")
+
+        self.capacity = capacity
+
+    @classmethod
+    def create(cls, name, size):
+        """Create the ring, or reuse an existing one so unread events survive."""
+        try:
+            shm = _open(name, create=True, size=HEADER_SIZE + size)
+        except FileExistsError:
+            return cls(_open(name))
+
+        HEADER.pack_into(shm.buf, 0, MAGIC, VERSION, size, 0, 0, 0)
+        return cls(shm)
+
+    @classmethod
+    def attach(cls, name):
+        return cls(_open(name))
+
+    # ----------------------------
+    # Locking
+    # ----------------------------
+    def _acquire(self):
+        self._thread_lock.acquire()
+        fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX)
+
+    def _release(self):
+        fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+        self._thread_lock.release()
+
+    def reset_after_fork(self):
+        # A lock file inherited across fork would be shared with the parent
+        self._lock_file.close()
+        self._lock_file = open(_lock_path(self._shm.name.lstrip("/")), "a")
+        self._thread_lock = threading.Lock()
+
+    # ----------------------------
+    # Producer
+    # ----------------------------
+    def push(self, record: bytes) -> bool:
+
+        needed = LENGTH.size + len(record)
+        if needed > self.capacity:
+            return False
+
+        buf = self._buf
+        capacity = self.capacity
+
+        self._acquire()
+        try:
+            _, _, _, head, tail, dropped = HEADER.unpack_from(buf, 0)
+
+            position = head % capacity
+            padding = 0
+            if capacity - position < needed:
+                padding = capacity - position
+
+            if capacity - (head - tail) < padding + needed:
+                struct.pack_into("<Q", buf, 32, dropped + 1)
+                return False
+
+            if padding:
+                if padding >= LENGTH.size:
+                    LENGTH.pack_into(buf, HEADER_SIZE + position, WRAP_MARKER)
+                head += padding
+                position = 0
+
+            start = HEADER_SIZE + position
+            LENGTH.pack_into(buf, start, len(record))
+            buf[start + LENGTH.size:start + needed] = record
+
+            struct.pack_into("<Q", buf, 16, head + needed)
+            return True
+        finally:
+            self._release()
+
+    # ----------------------------
+    # Consumer
+    # ----------------------------
+    def pop_all(self, max_bytes=None):
+        """Copy out every complete record (up to ~max_bytes) and free the space."""
+
+        buf = self._buf
+        capacity = self.capacity
+        records = []
+        taken = 0
+
+        self._acquire()
+        try:
+            _, _, _, head, tail, _ = HEADER.unpack_from(buf, 0)
+
+            while tail < head:
+                if max_bytes is not None and taken >= max_bytes:
+                    break
+
+                position = tail % capacity
+                if capacity - position < LENGTH.size:
+                    tail += capacity - position
+                    continue
+
+                (length,) = LENGTH.unpack_from(buf, HEADER_SIZE + position)
+                if length == WRAP_MARKER:
+                    tail += capacity - position
+                    continue
+
+                start = HEADER_SIZE + position + LENGTH.size
+                records.append(bytes(buf[start:start + length]))
+                tail += LENGTH.size + length
+                taken += length
+
+            struct.pack_into("<Q", buf, 24, tail)
+        finally:
+            self._release()
+
+        return records
+
+    def add_dropped(self, count):
+        self._acquire()
+        try:
+            dropped = struct.unpack_from("<Q", self._buf, 32)[0]
+            struct.pack_into("<Q", self._buf, 32, dropped + count)
+        finally:
+            self._release()
+
+    def take_dropped(self):
+        self._acquire()
+        try:
+            dropped = struct.unpack_from("<Q", self._buf, 32)[0]
+            struct.pack_into("<Q", self._buf, 32, 0)
+        finally:
+            self._release()
+        return dropped
+
+    def close(self, unlink=False):
+        self._buf = None
+        self._shm.close()
+        if unlink:
+            self._shm.unlink()
+
+
+class ShmTransport:
+    """
+    EventQueue transport that hands events to a per-host shipper
+    process through a SharedRing instead of a local Sender.
+
+    If the ring exists but can't be opened (e.g. the shipper runs as
+    another user), the process falls back to its own queue and Sender.
+    """
+
+    RETRY_ATTACH_SECONDS = 5
+
+    def __init__(self, name):
+        self.name = name
+        self._ring = None
+        self._next_attach = 0.0
+        self._dropped = 0
+        self._fallback_lock = threading.Lock()
+        self._fell_back = False
+
+    def push(self, event):
+        # Called from application code: never raises
+        try:
+            self._push(event)
+        except Exception:
+            self._dropped += 1
+
+    def _push(self, event):
+
+        ring = self._ring
+        if ring is None:
+            ring = self._try_attach()
+            if ring is None:
+                if self._fell_back:
+                    from .queue import EventQueue
+                    EventQueue.push(event)
+                else:
+                    self._dropped += 1
+                return
+
+        try:
+            record = marshal.dumps(event.to_tuple(os.getpid()))
+        except ValueError:
+            self._dropped += 1
+            return
+
+        ring.push(record)
+
+    def _try_attach(self):
+        # Shipper not running yet: retry now and then, never block the app
+        now = time.monotonic()
+        if now < self._next_attach:
+            return None
+
+        self._next_attach = now + self.RETRY_ATTACH_SECONDS
+
+        try:
+            self._ring = SharedRing.attach(self.name)
+        except (FileNotFoundError, ValueError):
+            self._ring = None
+            return None
+        except OSError:
+            # Exists but isn't ours to open (PermissionError, ...)
+            self._ring = None
+            self._fall_back()
+            return None
+
+        # Let the shipper report what was lost while it was away
+        if self._dropped:
+            self._ring.add_dropped(self._dropped)
+            self._dropped = 0
+
+        return self._ring
+
+    def _fall_back(self):
+
+        with self._fallback_lock:
+            if self._fell_back:
+                return
+            self._fell_back = True
+
+        from .config import AgentConfig
+        from .queue import EventQueue
+        from .sender import Sender
+        from .stats import AgentStats
+
+        AgentConfig.transport = "http"
+        EventQueue.set_transport(None)
+        Sender.start(lazy=AgentConfig.lazy_start)
+        AgentStats.incr("shm_fallbacks")
+
+    def reset_after_fork(self):
+        if self._ring is not None:
+            try:
+                self._ring.reset_after_fork()
+            except OSError:
+                # Re-attach (or fall back) on the next push, not mid-fork
+                self._ring = None
+                self._next_attach = 0.0
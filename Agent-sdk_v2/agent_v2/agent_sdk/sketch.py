@@ -0,0 +1,134 @@
+import math
+
+
+class DDSketch:
+    """
+    Mergeable quantile sketch with relative-error guarantees (DDSketch,
+    Masson et al., VLDB 2019).
+
+    A positive value v lands in bin ceil(log(v) / log(gamma)) with
+    gamma = (1 + alpha) / (1 - alpha), so every quantile is returned
+    within `alpha` relative error. Memory is bounded by `max_bins`:
+    past it, the lowest bins are folded together, which only costs
+    accuracy on the lowest quantiles. Sketches with the same alpha merge
+    by adding bin counts, across processes and time windows alike.
+    """
+
+    __slots__ = (
+        "alpha", "max_bins", "_log_gamma",
+        "bins", "zero_count", "count", "total", "min", "max"
+    )
+
+    # Values at or below this count as zero (log() is undefined there)
+    MIN_VALUE = 1e-9
+
+    def __init__(self, alpha=0.01, max_bins=2048):
+        if not 0 < alpha < 1:
+            raise ValueError(f"Unsupported relative accuracy: {alpha}")
+
+        self.alpha = alpha
+        self.max_bins = max_bins
+        self._log_gamma = math.log((1 + alpha) / (1 - alpha))
+
+        self.bins = {}
+        self.zero_count = 0
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def record(self, value, count=1):
+
+        if value <= self.MIN_VALUE:
+            self.zero_count += count
+        else:
+            index = math.ceil(math.log(value) / self._log_gamma)
+            self.bins[index] = self.bins.get(index, 0) + count
+
+            if len(self.bins) > self.max_bins:
+                self._collapse()
+
+        self.count += count
+        self.total += value * count
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        if other.alpha != self.alpha:
+            raise ValueError("Only sketches with the same alpha can be merged")
+        if not other.count:
+            return
+
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+        if len(self.bins) > self.max_bins:
+            self._collapse()
+
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.total += other.total
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def quantile(self, q):
+        """Value at quantile q (0..1), or None for an empty sketch."""
+
+        if not self.count:
+            return None
+
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return 0.0
+
+        seen = self.zero_count
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen > rank:
+                # Bin midpoint in relative terms: within alpha of any value in it
+                gamma = math.exp(self._log_gamma)
+                value = 2 * gamma ** index / (gamma + 1)
+                return min(max(value, self.min), self.max)
+
+        return self.max
+
+    def _collapse(self):
+        # Fold the lowest bins into the lowest one kept
+        indexes = sorted(self.bins)
+        excess = len(indexes) - self.max_bins
+        folded = sum(self.bins.pop(index) for index in indexes[:excess])
+        self.bins[indexes[excess]] += folded
+
+    def to_dict(self):
+        # Bins are contiguous in practice, so dense counts from an offset
+        offset = min(self.bins) if self.bins else 0
+        counts = [0] * ((max(self.bins) - offset + 1) if self.bins else 0)
+        for index, count in self.bins.items():
+            counts[index - offset] = count
+
+        return {
+            "scheme": "ddsketch",
+            "alpha": self.alpha,
+            "offset": offset,
+            "counts": counts,
+            "zero_count": self.zero_count,
+            "min": self.min,
+            "max": self.max,
+            "sum": self.total
+        }
+
+    @classmethod
+    def from_dict(cls, data, max_bins=2048):
+        sketch = cls(data["alpha"], max_bins)
+
+        for position, count in enumerate(data["counts"]):
+            if count:
+                sketch.bins[data["offset"] + position] = count
+
+        sketch.zero_count = data["zero_count"]
+        sketch.count = sketch.zero_count + sum(sketch.bins.values())
+        sketch.total = data["sum"]
+        sketch.min = data["min"]
+        sketch.max = data["max"]
+        return sketch
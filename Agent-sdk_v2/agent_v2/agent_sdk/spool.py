@@ -0,0 +1,278 @@
+import json
+import os
+import struct
+import threading
+import zlib
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+# Writers a forked child inherited and must never close (see abandon_after_fork)
+_ABANDONED_WRITERS = []
+
+
+def claim_spool_dir(base, max_slots=256):
+    """
+    Lock the first free `slot-N` subdirectory of `base` for this process.
+
+    Forked workers each end up with their own slot, and a restarted
+    worker adopts whatever an earlier process left behind in a free
+    slot. Returns (directory, lock_file); the lock lasts as long as
+    lock_file stays open.
+    """
+
+    if fcntl is None:
+        return base, None
+
+    for slot in range(max_slots):
+        directory = os.path.join(base, f"slot-{slot}")
+        os.makedirs(directory, exist_ok=True)
+
+        lock_file = open(os.path.join(directory, "lock"), "a")
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            continue
+
+        return directory, lock_file
+
+    raise RuntimeError(f"No free spool slot under {base}")
+
+
+class DiskSpool:
+    """
+    Append-only, segment-based on-disk store for undeliverable batches.
+
+    Layout of `directory`:
+
+        00000001.seg, 00000002.seg, ...   framed batch records
+        checkpoint                        "<segment> <offset>" of the next
+                                          record to replay
+
+    Each record is a 4-byte length, a 4-byte CRC32 and a JSON payload.
+    A record is only skipped once `ack` has durably moved the checkpoint
+    past it, so an acknowledged batch is never replayed again. A torn
+    record left by a crash fails its CRC and ends that segment.
+    """
+
+    HEADER = struct.Struct(">II")
+    SUFFIX = ".seg"
+
+    def __init__(self, directory, max_bytes, segment_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.segment_bytes = segment_bytes
+
+        self._lock = threading.Lock()
+        self._writer = None
+        self._writer_id = None
+
+        os.makedirs(directory, exist_ok=True)
+
+        self._segments = sorted(
+            int(name[:-len(self.SUFFIX)])
+            for name in os.listdir(directory)
+            if name.endswith(self.SUFFIX) and name[:-len(self.SUFFIX)].isdigit()
+        )
+        self._checkpoint = self._read_checkpoint()
+
+    # ----------------------------
+    # Writing
+    # ----------------------------
+    def append(self, record):
+        payload = json.dumps(record, separators=(",", ":")).encode()
+        frame = self.HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+        with self._lock:
+            if (
+                self._writer is None
+                or self._writer.tell() + len(frame) > self.segment_bytes
+            ):
+                self._rotate()
+
+            self._writer.write(frame)
+            self._writer.flush()
+            os.fsync(self._writer.fileno())
+
+            return self._enforce_cap()
+
+    def _rotate(self):
+        # Never append to a segment from a previous run: its tail may be torn
+        if self._writer is not None:
+            self._writer.close()
+
+        # Ids only grow, so a stale checkpoint can never point at a new segment
+        last = self._segments[-1] if self._segments else 0
+        self._writer_id = max(last, self._checkpoint[0]) + 1
+        self._segments.append(self._writer_id)
+        self._writer = open(self._path(self._writer_id), "ab")
+
+    def _enforce_cap(self):
+        # Delete the oldest segments once the spool outgrows max_bytes
+        dropped = 0
+
+        while len(self._segments) > 1 and self._total_bytes() > self.max_bytes:
+            oldest = self._segments.pop(0)
+            self._remove(oldest)
+            dropped += 1
+
+            if self._checkpoint[0] <= oldest:
+                self._write_checkpoint((self._segments[0], 0))
+
+        return dropped
+
+    # ----------------------------
+    # Replay
+    # ----------------------------
+    def peek(self):
+        """
+        Oldest record not yet acknowledged, as (position, record),
+        or None when the spool is drained.
+        """
+
+        with self._lock:
+            while self._segments:
+                segment, offset = self._checkpoint
+
+                if segment not in self._segments:
+                    segment, offset = self._segments[0], 0
+                    self._write_checkpoint((segment, offset))
+
+                record, next_offset = self._read_at(segment, offset)
+
+                if record is not None:
+                    return (segment, next_offset), record
+
+                # End of segment (or torn tail): move on unless still writing
+                if segment == self._writer_id:
+                    return None
+
+                self._segments.remove(segment)
+                self._remove(segment)
+
+                if self._segments:
+                    self._write_checkpoint((self._segments[0], 0))
+
+            return None
+
+    def ack(self, position):
+        """Durably mark everything before `position` as delivered."""
+        with self._lock:
+            self._write_checkpoint(position)
+
+            # Drop a fully replayed segment right away unless it's still open
+            segment, offset = position
+            if (
+                segment != self._writer_id
+                and segment in self._segments
+                and offset >= os.path.getsize(self._path(segment))
+            ):
+                self._segments.remove(segment)
+                self._remove(segment)
+
+    def close(self):
+        with self._lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+    def abandon_after_fork(self):
+        """
+        Child side of fork: let go of the parent's segment without taking
+        the inherited lock (a parent thread may have held it) or flushing
+        a half-written buffer into the parent's file.
+        """
+
+        writer = self._writer
+        if writer is None:
+            return
+
+        # The fd now points at /dev/null; the file object is kept alive so
+        # it's never closed (closing may wait on its inherited buffer lock)
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        try:
+            os.dup2(devnull, writer.fileno())
+        finally:
+            os.close(devnull)
+
+        _ABANDONED_WRITERS.append(writer)
+
+    def __bool__(self):
+        with self._lock:
+            if not self._segments:
+                return False
+
+            segment, offset = self._checkpoint
+            if segment != self._segments[-1]:
+                return True
+
+            return offset < os.path.getsize(self._path(segment))
+
+    # ----------------------------
+    # Helpers
+    # ----------------------------
+    def _read_at(self, segment, offset):
+        try:
+            with open(self._path(segment), "rb") as fh:
+                fh.seek(offset)
+                header = fh.read(self.HEADER.size)
+
+                if len(header) < self.HEADER.size:
+                    return None, offset
+
+                length, crc = self.HEADER.unpack(header)
+                payload = fh.read(length)
+        except OSError:
+            return None, offset
+
+        if len(payload) < length or zlib.crc32(payload) != crc:
+            return None, offset
+
+        try:
+            record = json.loads(payload)
+        except ValueError:
+            return None, offset
+
+        return record, offset + self.HEADER.size + length
+
+    def _read_checkpoint(self):
+        try:
+            with open(os.path.join(self.directory, "checkpoint")) as fh:
+                segment, offset = fh.read().split()
+            return int(segment), int(offset)
+        except (OSError, ValueError):
+            return (self._segments[0] if self._segments else 0), 0
+
+    def _write_checkpoint(self, position):
+        path = os.path.join(self.directory, "checkpoint")
+        tmp_path = path + ".tmp"
+
+        with open(tmp_path, "w") as fh:
+            fh.write(f"{position[0]} {position[1]}")
+            fh.flush()
+            os.fsync(fh.fileno())
+
+        os.replace(tmp_path, path)
+        self._checkpoint = position
+
+    def _total_bytes(self):
+        total = 0
+        for segment in self._segments:
+            try:
+                total += os.path.getsize(self._path(segment))
+            except OSError:
+                pass
+        return total
+
+    def _remove(self, segment):
+        try:
+            os.remove(self._path(segment))
+        except OSError:
+            pass
+
+    def _path(self, segment):
+        return os.path.join(self.directory, f"{segment:08d}{self.SUFFIX}")
@@ -0,0 +1,174 @@
+import traceback
+from functools import lru_cache
+from itertools import islice
+from types import CodeType
+
+
+# Distinct frame lists whose formatted text is kept
+STACK_CACHE_SIZE = 1024
+
+# Rough rendered size of one frame ("  File ..., line N, in f" plus source)
+FRAME_BYTES = 120
+
+_CAUSE = "\nThe above exception was the direct cause of the following exception:\n\n"
+_CONTEXT = "\nDuring handling of the above exception, another exception occurred:\n\n"
+
+# Python 3.11+ tracebacks point at the failing expression (the ^^^ lines)
+_HAS_POSITIONS = hasattr(CodeType, "co_positions")
+
+
+def tb_frames(exc_traceback):
+    """
+    (code object, line, last instruction) per traceback frame, outermost
+    first; reads no source.
+    """
+    frames = []
+    tb = exc_traceback
+    while tb is not None:
+        frames.append((tb.tb_frame.f_code, tb.tb_lineno, tb.tb_lasti))
+        tb = tb.tb_next
+    return tuple(frames)
+
+
+def _positions(code, lasti):
+    # (end line, column, end column) of the instruction, where known
+    if not _HAS_POSITIONS or lasti < 0:
+        return None, None, None
+    _, end_lineno, colno, end_colno = next(
+        islice(code.co_positions(), lasti // 2, None), (None,) * 4
+    )
+    return end_lineno, colno, end_colno
+
+
+def _portable(frames):
+    # (filename, line, function, end line, column, end column): what
+    # rendering needs, and marshal-safe
+    return tuple(
+        (code.co_filename, lineno, code.co_name) + _positions(code, lasti)
+        for code, lineno, lasti in frames
+    ) if frames and isinstance(frames[0][0], CodeType) else frames
+
+
+@lru_cache(maxsize=STACK_CACHE_SIZE)
+def _render_frames(frames):
+    # Keyed by the raw frames, so a hit skips resolving them too
+    summaries = []
+    for filename, lineno, name, end_lineno, colno, end_colno in _portable(frames):
+        # Source lines are read from linecache when formatted, on the sender thread
+        positions = (
+            {"end_lineno": end_lineno, "colno": colno, "end_colno": end_colno}
+            if _HAS_POSITIONS else {}
+        )
+        summaries.append(traceback.FrameSummary(
+            filename, lineno, name, lookup_line=False, **positions
+        ))
+
+    return "".join(traceback.StackSummary.from_list(summaries).format())
+
+
+def _exception_lines(exc_type, exc_value):
+    # format_exception_only builds a TracebackException, re-walking every
+    # chained traceback; the usual one-line "Type: message" is done here
+    if exc_value is None or isinstance(exc_value, SyntaxError) or hasattr(exc_value, "__notes__"):
+        return traceback.format_exception_only(exc_type, exc_value)
+
+    try:
+        message = str(exc_value)
+    except Exception:
+        return traceback.format_exception_only(exc_type, exc_value)
+
+    name = exc_type.__qualname__
+    module = exc_type.__module__
+    if module not in ("__main__", "builtins"):
+        name = f"{module}.{name}" if isinstance(module, str) else f"<unknown>.{name}"
+
+    return [f"{name}: {message}\n" if message else f"{name}\n"]
+
+
+class LazyStack:
+    """
+    Exception chain captured as raw frames, rendered as the usual
+    traceback text by `render` (called from EventRecord.to_dict, on the
+    sender thread). Identical frame lists are formatted once.
+
+    `links` runs from the oldest exception in the chain to the newest:
+    (frames, exception-only lines, message printed before this link).
+    """
+
+    __slots__ = ("links",)
+
+    def __init__(self, links):
+        self.links = links
+
+    def render(self):
+        parts = []
+
+        for frames, exception_lines, message in self.links:
+            if message:
+                parts.append(message)
+            if frames:
+                parts.append("Traceback (most recent call last):\n")
+                parts.append(_render_frames(frames))
+            parts.extend(exception_lines)
+
+        return "".join(parts)
+
+    def size_hint(self):
+        """Approximate rendered length, without rendering."""
+        return sum(
+            len(frames) * FRAME_BYTES + sum(map(len, lines))
+            for frames, lines, _ in self.links
+        )
+
+    def portable(self):
+        """Plain tuples (no code objects) for handing to another process."""
+        return tuple(
+            (_portable(frames), tuple(lines), message)
+            for frames, lines, message in self.links
+        )
+
+
+def capture(exc_type, exc_value, exc_traceback, frames=None):
+    """
+    LazyStack for an exception, following __cause__ / __context__ like
+    traceback.format_exception. Only the frames and the final
+    "Type: message" lines are taken here.
+    """
+
+    links = []
+    seen = set()
+
+    while True:
+        if frames is None:
+            frames = tb_frames(exc_traceback)
+
+        older = message = None
+        if exc_value is not None:
+            seen.add(id(exc_value))
+
+            cause = exc_value.__cause__
+            context = exc_value.__context__
+
+            if cause is not None and id(cause) not in seen:
+                older, message = cause, _CAUSE
+            elif (
+                context is not None
+                and not exc_value.__suppress_context__
+                and id(context) not in seen
+            ):
+                older, message = context, _CONTEXT
+
+        links.append((
+            frames,
+            _exception_lines(exc_type, exc_value),
+            message
+        ))
+
+        if older is None:
+            break
+
+        exc_type, exc_value, exc_traceback = type(older), older, older.__traceback__
+        frames = None
+
+    links.reverse()
+    return LazyStack(tuple(links))
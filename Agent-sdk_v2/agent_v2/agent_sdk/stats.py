@@ -0,0 +1,48 @@
+import threading
+
+
+class AgentStats:
+    """
+    Agent self-metrics, reported in every batch's `batch_meta`.
+
+    Counters and peaks are reset by each snapshot; gauges keep their
+    last value.
+    """
+
+    _lock = threading.Lock()
+    _counters = {}
+    _peaks = {}
+    _gauges = {}
+
+    @classmethod
+    def incr(cls, name, value=1):
+        with cls._lock:
+            cls._counters[name] = cls._counters.get(name, 0) + value
+
+    @classmethod
+    def gauge(cls, name, value):
+        with cls._lock:
+            cls._gauges[name] = value
+
+    @classmethod
+    def peak(cls, name, value):
+        """Track the highest value seen since the previous snapshot."""
+        with cls._lock:
+            if value > cls._peaks.get(name, value - 1):
+                cls._peaks[name] = value
+
+    @classmethod
+    def snapshot(cls):
+        with cls._lock:
+            snapshot = dict(cls._gauges)
+            snapshot.update(cls._peaks)
+            snapshot.update(cls._counters)
+            cls._counters = {}
+            cls._peaks = {}
+        return snapshot
+
+    @classmethod
+    def reset_after_fork(cls):
+        cls._lock = threading.Lock()
+        cls._counters = {}
+        cls._peaks = {}
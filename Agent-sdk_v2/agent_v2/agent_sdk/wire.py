@@ -0,0 +1,162 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+
+COLUMNAR_SCHEMA_VERSION = "2.0"
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Meta fields that differ per event; the rest of meta is shared
+PER_EVENT_META = ("timestamp", "trace_id")
+
+EVENT_FIELDS = ("category", "type", "severity", "status")
+
+
+def _to_micros(timestamp):
+    delta = datetime.fromisoformat(timestamp) - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+
+
+def _from_micros(micros):
+    return (_EPOCH + timedelta(microseconds=micros)).isoformat()
+
+
+class _Table:
+    """Deduplicating table: values go in once, events keep an index."""
+
+    def __init__(self):
+        self.values = []
+        self._index = {}
+
+    def add(self, value, key=None):
+        key = value if key is None else key
+        index = self._index.get(key)
+
+        if index is None:
+            index = len(self.values)
+            self._index[key] = index
+            self.values.append(value)
+
+        return index
+
+
+class _IdentityTable(_Table):
+    # Keyed by content; events from one process share the same identity
+    # object, so id() saves re-encoding it for every event
+    def __init__(self):
+        super().__init__()
+        self._by_id = {}
+
+    def add_identity(self, identity):
+        index = self._by_id.get(id(identity))
+        if index is None:
+            key = json.dumps(identity, sort_keys=True, separators=(",", ":"))
+            index = self.add(identity, key)
+            self._by_id[id(identity)] = index
+        return index
+
+
+def encode_events(events):
+    """
+    Columnar form of v1 events for a schema 2.0 batch, or None when
+    an event can't be represented exactly (the caller then sends v1).
+
+    Meta and identity blocks are sent once per distinct value, event
+    fields become parallel columns and strings are dictionary-encoded.
+    """
+
+    strings = _Table()
+    metas = _Table()
+    identities = _IdentityTable()
+    shapes = _Table()
+
+    meta_column = []
+    identity_column = []
+    timestamps = []
+    trace_ids = []
+    fields = {name: [] for name in EVENT_FIELDS}
+    metric_shapes = []
+    data_shapes = []
+    metric_values = {}
+    data_values = {}
+
+    try:
+        for position, event in enumerate(events):
+            meta = event["meta"]
+            body = event["event"]
+
+            timestamp = meta["timestamp"]
+            micros = _to_micros(timestamp)
+            if _from_micros(micros) != timestamp:
+                return None
+
+            shared = {k: v for k, v in meta.items() if k not in PER_EVENT_META}
+
+            meta_column.append(metas.add(shared, tuple(shared.items())))
+            identity_column.append(identities.add_identity(event["identity"]))
+            timestamps.append(micros)
+            trace_ids.append(meta["trace_id"])
+
+            for name in EVENT_FIELDS:
+                fields[name].append(strings.add(body[name]))
+
+            metric_shapes.append(_add_row(
+                body["metrics"], position, shapes, metric_values
+            ))
+            data_shapes.append(_add_row(
+                body["data"], position, shapes, data_values
+            ))
+    except (KeyError, TypeError, ValueError):
+        return None
+
+    count = len(events)
+    base = timestamps[0] if timestamps else 0
+
+    return {
+        "strings": strings.values,
+        "metas": metas.values,
+        "identities": identities.values,
+        "shapes": shapes.values,
+        "columns": {
+            "meta": meta_column,
+            "identity": identity_column,
+            "timestamp_base": base,
+            "timestamp_delta": [micros - base for micros in timestamps],
+            "trace_id": trace_ids,
+            **fields,
+            "metrics_shape": metric_shapes,
+            "metrics": _encode_columns(metric_values, count, strings),
+            "data_shape": data_shapes,
+            "data": _encode_columns(data_values, count, strings)
+        }
+    }
+
+
+def _add_row(values, position, shapes, columns):
+    # Shape = the event's key order; columns hold one slot per event
+    if not isinstance(values, dict):
+        raise TypeError("metrics and data must be dicts")
+
+    keys = tuple(values)
+    for key in keys:
+        columns.setdefault(key, {})[position] = values[key]
+    return shapes.add(list(keys), keys)
+
+
+def _encode_columns(columns, count, strings):
+
+    encoded = {}
+
+    for key, present in columns.items():
+        values = [present.get(position) for position in range(count)]
+
+        if all(isinstance(v, str) for v in present.values()):
+            # {"s": [...]} holds string-table indexes, {"v": [...]} raw values
+            encoded[key] = {"s": [
+                None if v is None else strings.add(v) for v in values
+            ]}
+        else:
+            encoded[key] = {"v": values}
+
+    return encoded
+
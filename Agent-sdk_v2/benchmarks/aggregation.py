@@ -0,0 +1,78 @@
+"""
+Events queued for a burst of successful requests, with and without
+client-side pre-aggregation (AgentConfig.aggregation).
+
+Requests are spread over a handful of routes with ~1% slow outliers,
+the shape of a healthy service. Without aggregation every request is
+an INCOMING_REQUEST event; with it, only outliers are, plus one METRICS
+event per (route, method, status class) per flush.
+
+    python benchmarks/aggregation.py --requests 200000
+"""
+import argparse
+import random
+import time
+
+from agent_sdk.config import AgentConfig
+from agent_sdk.event_builder import build_event
+from agent_sdk.metrics import EndpointMetrics
+from agent_sdk.queue import EventQueue
+
+
+ROUTES = ["/api/orders/<id>", "/api/users/<id>", "/api/cart", "/health", "/api/search"]
+
+
+def handle(route, duration_ms):
+    # What an integration does once a request finished with a 200
+    if EndpointMetrics.record(
+        "INCOMING_REQUEST", "APPLICATION",
+        {"route": route, "method": "GET"}, duration_ms, 200
+    ):
+        return
+
+    EventQueue.push(build_event(
+        event_type="INCOMING_REQUEST",
+        category="APPLICATION",
+        status="SUCCESS",
+        metrics={"duration_ms": int(duration_ms)},
+        data={"path": route, "method": "GET", "status_code": 200}
+    ))
+
+
+def run(requests, aggregation):
+    AgentConfig.aggregation = aggregation
+    EventQueue.configure(capacity=requests + 1000)
+    EventQueue.flush()
+
+    rng = random.Random(1)
+    workload = [
+        (rng.choice(ROUTES), rng.lognormvariate(3, 0.5) if rng.random() > 0.01 else 1500.0)
+        for _ in range(requests)
+    ]
+
+    start = time.perf_counter()
+    for route, duration_ms in workload:
+        handle(route, duration_ms)
+    elapsed = time.perf_counter() - start
+
+    EndpointMetrics.flush()
+    return elapsed, len(EventQueue.flush())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200000)
+    args = parser.parse_args()
+
+    AgentConfig.shed_low_watermark = None
+
+    for aggregation in (False, True):
+        elapsed, events = run(args.requests, aggregation)
+        print(
+            f"aggregation={aggregation!s:<5}  {elapsed / args.requests * 1e9:5.0f} ns/request  "
+            f"{events:7d} events queued for {args.requests} requests"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+A failing dependency: the same exception and log message, over and over.
+
+Compares the application-thread cost per occurrence and the events
+queued with coalescing off and on (AgentConfig.coalesce).
+
+    python benchmarks/coalesce.py --occurrences 20000
+"""
+import argparse
+import logging
+import sys
+import time
+
+from agent_sdk.coalesce import Coalescer
+from agent_sdk.config import AgentConfig
+from agent_sdk.exceptions import ExceptionTracker
+from agent_sdk.logging_capture import AgentLogHandler
+from agent_sdk.queue import EventQueue
+
+
+def call_dependency(depth=8):
+    if depth:
+        return call_dependency(depth - 1)
+    raise ConnectionError("upstream refused connection")
+
+
+def report_exception():
+    try:
+        call_dependency()
+    except ConnectionError:
+        ExceptionTracker._process_exception(*sys.exc_info(), handled=True)
+
+
+def run(occurrences, coalesce, fn):
+    AgentConfig.coalesce = coalesce
+    EventQueue.configure(capacity=occurrences + 1000)
+    EventQueue.flush()
+
+    start = time.perf_counter()
+    for _ in range(occurrences):
+        fn()
+    elapsed = time.perf_counter() - start
+
+    Coalescer.flush()
+    return elapsed, EventQueue.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--occurrences", type=int, default=20000)
+    args = parser.parse_args()
+
+    AgentConfig.shed_low_watermark = None
+
+    logger = logging.getLogger("payments.client")
+    logger.propagate = False
+    logger.addHandler(AgentLogHandler())
+    log_error = lambda: logger.error("charge %s failed: %s", "order-42", "timeout")
+
+    for name, fn in (("exception", report_exception), ("log", log_error)):
+        for coalesce in (False, True):
+            elapsed, events = run(args.occurrences, coalesce, fn)
+            counted = sum(event.metrics.get("occurrences", 1) for event in events)
+            print(
+                f"{name:<9} coalesce={coalesce!s:<5} "
+                f"{elapsed / args.occurrences * 1e6:6.2f} us/occurrence  "
+                f"{len(events):6d} events for {counted} occurrences"
+            )
+
+
+if __name__ == "__main__":
+    main()
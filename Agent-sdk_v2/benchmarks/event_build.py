@@ -0,0 +1,56 @@
+"""
+Per-event cost on the application thread.
+
+Compares `build_event` (compact record, what the request thread pays
+now) with `build_event(...).to_dict()` (the full event dict, which is
+what every request used to pay and the sender thread pays now).
+
+    python benchmarks/event_build.py --events 200000
+"""
+import argparse
+import time
+
+from agent_sdk.event_builder import build_event
+
+
+DATA = {
+    "method": "GET",
+    "path": "/api/orders/42",
+    "status_code": 200
+}
+
+METRICS = {"response_time_ms": 12.5}
+
+
+def hot_path():
+    return build_event("API_CALL", "HTTP", "SUCCESS", DATA, METRICS)
+
+
+def full_dict():
+    return build_event("API_CALL", "HTTP", "SUCCESS", DATA, METRICS).to_dict()
+
+
+def run(fn, events):
+    start = time.perf_counter()
+    for _ in range(events):
+        fn()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    results = {}
+    for name, fn in (("record", hot_path), ("dict", full_dict)):
+        results[name] = min(run(fn, args.events) for _ in range(args.repeat))
+        per_event = results[name] / args.events * 1e9
+        print(f"{name:<7} {results[name]:.3f}s  {per_event:.0f} ns/event")
+
+    print(f"speedup {results['dict'] / results['record']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+EventQueue.push contention benchmark.
+
+Starts N threads that push events as fast as they can and compares the
+shared (single lock) queue with the thread_local (sharded) queue.
+
+    python benchmarks/queue_contention.py --threads 64 --events 20000
+"""
+import argparse
+import threading
+import time
+
+from agent_sdk.config import AgentConfig
+from agent_sdk.event_builder import build_event
+from agent_sdk.queue import EventQueue
+
+
+def run(mode, threads, events):
+
+    EventQueue.configure(capacity=threads * events, mode=mode)
+    AgentConfig.thread_buffer_capacity = events
+    AgentConfig.shed_low_watermark = None   # keep every pushed event
+
+    event = build_event(
+        event_type="LOG",
+        category="APPLICATION",
+        status="SUCCESS",
+        data={}
+    )
+    barrier = threading.Barrier(threads + 1)
+
+    def worker():
+        push = EventQueue.push
+        barrier.wait()
+        for _ in range(events):
+            push(event)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+
+    barrier.wait()
+    start = time.perf_counter()
+
+    for thread in workers:
+        thread.join()
+
+    elapsed = time.perf_counter() - start
+
+    assert len(EventQueue.flush()) == threads * events
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=64)
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    results = {}
+    for mode in ("shared", "thread_local"):
+        results[mode] = min(
+            run(mode, args.threads, args.events) for _ in range(args.repeat)
+        )
+        rate = args.threads * args.events / results[mode]
+        print(f"{mode:<13} {results[mode]:.3f}s  {rate / 1e6:.2f}M pushes/s")
+
+    print(f"speedup       {results['shared'] / results['thread_local']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
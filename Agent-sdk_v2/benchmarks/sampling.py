@@ -0,0 +1,74 @@
+"""
+Head sampling: cost per request on the application thread and how well
+sample weights extrapolate the real count.
+
+Runs the FastAPI-style success path (classify, sample, build, push) at
+100% and at 1% for INCOMING_REQUEST, then a burst with a 10% rate and
+adaptive sampling against a queue nobody drains.
+
+    python benchmarks/sampling.py --requests 200000
+"""
+import argparse
+import time
+
+from agent_sdk.config import AgentConfig
+from agent_sdk.event_builder import build_event
+from agent_sdk.queue import EventQueue
+from agent_sdk.sampling import Sampler
+
+
+def handle():
+    weight = Sampler.sample("INCOMING_REQUEST")
+    if weight is None:
+        return
+
+    EventQueue.push(build_event(
+        event_type="INCOMING_REQUEST",
+        category="APPLICATION",
+        status="SUCCESS",
+        metrics={"duration_ms": 12},
+        data={"path": "/api/orders/42", "method": "GET", "status_code": 200},
+        sample_weight=weight
+    ))
+
+
+def run(requests, rates, adaptive=False, capacity=None):
+    AgentConfig.sample_rates = rates
+    AgentConfig.adaptive_sampling = adaptive
+    Sampler.reset_after_fork()
+    EventQueue.configure(capacity=capacity or requests + 1000)
+    EventQueue.flush()
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        handle()
+    elapsed = time.perf_counter() - start
+
+    events = EventQueue.flush()
+    estimate = sum(event.metrics.get("sample_weight", 1) for event in events)
+    return elapsed, len(events), estimate
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200000)
+    args = parser.parse_args()
+
+    AgentConfig.shed_low_watermark = None
+    AgentConfig.sampling_adjust_interval = 0.01
+
+    for label, rates, adaptive, capacity in (
+        ("rate 100%", {}, False, None),
+        ("rate 1%", {"INCOMING_REQUEST": 0.01}, False, None),
+        ("rate 10%, adaptive", {"INCOMING_REQUEST": 0.1}, True, 5000),
+    ):
+        elapsed, kept, estimate = run(args.requests, rates, adaptive, capacity)
+        print(
+            f"{label:<20} {elapsed / args.requests * 1e9:5.0f} ns/request  "
+            f"{kept:7d} kept  estimated {estimate:9.0f} of {args.requests}  "
+            f"scale {Sampler._scale:.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Batch signing cost per upload attempt.
+
+Compares the old scheme (json.dumps of the whole body string, then a
+fresh HMAC over timestamp + body on every attempt) with signing the
+body bytes once per batch and finishing a copy per attempt.
+
+    python benchmarks/signing.py --size-mb 4 --attempts 5
+"""
+import argparse
+import hashlib
+import hmac
+import json
+import time
+
+from agent_sdk.security import finish_signature, sign_body
+
+
+SECRET = "super-secret"
+TIMESTAMP = "2026-01-01T00:00:00.000000+00:00"
+
+
+def old_scheme(body, attempts):
+    text = body.decode()
+    for _ in range(attempts):
+        message = TIMESTAMP + json.dumps(text, sort_keys=True)
+        hmac.new(SECRET.encode(), message.encode(), hashlib.sha256).hexdigest()
+
+
+def new_scheme(body, attempts):
+    body_mac = sign_body(SECRET, (body,))
+    for _ in range(attempts):
+        finish_signature(body_mac, TIMESTAMP)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size-mb", type=float, default=4)
+    parser.add_argument("--attempts", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    event = json.dumps({"path": "/api/orders/42", "message": "line \"quoted\"\n"})
+    count = int(args.size_mb * 1024 * 1024 / len(event))
+    body = ("[" + ",".join([event] * count) + "]").encode()
+
+    results = {}
+    for name, fn in (("old", old_scheme), ("new", new_scheme)):
+        results[name] = min(
+            timed(fn, body, args.attempts) for _ in range(args.repeat)
+        )
+        print(f"{name:<4} {results[name] * 1000:8.2f} ms for {args.attempts} attempts")
+
+    print(f"speedup {results['old'] / results['new']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
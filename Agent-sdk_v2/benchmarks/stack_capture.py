@@ -0,0 +1,70 @@
+"""
+Stack capture: what an exception costs the application thread, and what
+rendering the traceback costs the sender thread.
+
+Compares traceback.format_exception against stacks.capture for a chained
+exception raised through a few dozen frames, then times LazyStack.render
+with a cold and a warm frame cache.
+
+    python benchmarks/stack_capture.py --iterations 5000 --depth 30
+"""
+import argparse
+import sys
+import time
+import traceback
+
+from agent_sdk.stacks import _render_frames, capture
+
+
+def call_dependency(depth):
+    if depth:
+        return call_dependency(depth - 1)
+    raise ConnectionError("upstream refused connection")
+
+
+def failing_request(depth):
+    try:
+        call_dependency(depth)
+    except ConnectionError as e:
+        raise RuntimeError("order service unavailable") from e
+
+
+def exc_info(depth):
+    try:
+        failing_request(depth)
+    except RuntimeError:
+        return sys.exc_info()
+
+
+def timed(iterations, fn):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--depth", type=int, default=30)
+    args = parser.parse_args()
+
+    info = exc_info(args.depth)
+    stack = capture(*info)
+    assert stack.render() == "".join(traceback.format_exception(*info))
+
+    def render_cold():
+        _render_frames.cache_clear()
+        stack.render()
+
+    for label, fn in (
+        ("format_exception (app thread)", lambda: traceback.format_exception(*info)),
+        ("capture (app thread)", lambda: capture(*info)),
+        ("render, cold cache (sender)", render_cold),
+        ("render, cached (sender)", stack.render),
+    ):
+        print(f"{label:<32} {timed(args.iterations, fn):8.2f} us/exception")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Cold-start cost: `import agent_sdk` and `Agent.init` in a fresh process.
+
+Each run is a new interpreter, so module imports are never cached.
+The first event is built and materialized too, which is where the
+host identity (and its DNS lookup) used to be resolved.
+
+    python benchmarks/startup.py --runs 10
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+
+
+PROBE = """
+import time
+start = time.perf_counter()
+
+import agent_sdk
+imported = time.perf_counter()
+
+from agent_sdk import Agent
+Agent.init(
+    api_key="bench", api_secret="bench", endpoint="http://127.0.0.1:9/",
+    project="bench", enable_http={enable_http}, lazy_start=True
+)
+initialized = time.perf_counter()
+
+from agent_sdk.event_builder import build_event
+build_event("LOG", "APPLICATION", "SUCCESS", {{}}).to_dict()
+first_event = time.perf_counter()
+
+print(imported - start, initialized - imported, first_event - initialized)
+"""
+
+
+def run(enable_http):
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE.format(enable_http=enable_http)],
+        capture_output=True, text=True, check=True
+    ).stdout
+    return [float(value) * 1000 for value in output.split()]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    for enable_http in (False, True):
+        samples = [run(enable_http) for _ in range(args.runs)]
+        import_ms, init_ms, event_ms = (
+            statistics.median(column) for column in zip(*samples)
+        )
+        print(
+            f"enable_http={enable_http!s:<5}  import {import_ms:6.2f} ms  "
+            f"init {init_ms:6.2f} ms  first event {event_ms:6.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Peak sender memory while producing one large batch body.
+
+Compares the buffered upload (payload dict, serialized body and
+compressed copy) with the chunked NDJSON stream, which is consumed
+chunk by chunk as the HTTP client would.
+
+    python benchmarks/upload_memory.py --events 50000
+"""
+import argparse
+import tracemalloc
+
+from agent_sdk.config import AgentConfig
+from agent_sdk.event_builder import build_event
+from agent_sdk.sender import Batch, Sender
+
+
+def buffered(batch):
+    Sender._serialize(batch)
+    Sender._encode_body(batch.body)
+
+
+def streamed(batch):
+    for _ in Sender._encoded_stream(batch, Sender._pick_encoding()):
+        pass
+
+
+def peak(fn, batch):
+    tracemalloc.start()
+    fn(batch)
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak_bytes
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=50000)
+    parser.add_argument("--compression", default="gzip")
+    args = parser.parse_args()
+
+    AgentConfig.compression = args.compression
+    AgentConfig.compression_min_bytes = 0
+    AgentConfig.batch_schema_version = "1.0"
+
+    events = Batch.from_records([
+        build_event(
+            "API_CALL", "HTTP", "SUCCESS",
+            {"method": "GET", "path": f"/api/orders/{i}", "status_code": 200},
+            {"response_time_ms": 12.5}
+        )
+        for i in range(args.events)
+    ]).events
+
+    for name, fn in (("buffered", buffered), ("streamed", streamed)):
+        print(f"{name:<9} peak {peak(fn, Batch(events)) / 1e6:8.2f} MB")
+
+    print(f"chunk     {AgentConfig.stream_chunk_bytes / 1e6:8.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,86 @@
-from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi import FastAPI, Header, HTTPException, Request, Response
+import asyncio
 import hmac
 import hashlib
+import io
 import json
-from datetime import datetime, timezone
+import math
+import time
+import zlib
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
 
-app = FastAPI()
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+# ----------------------------
+# Backpressure
+# ----------------------------
+
+# Batches wait here until the ingest worker stores them
+INGEST_QUEUE = asyncio.Queue()
+INGEST_MAX_EVENTS = 50000          # queued events before answering 429
+INGEST_STATE = {"queued_events": 0, "drain_rate": 1000.0}   # events/s (EWMA)
+
+# Per-API-key credits per window, advertised in X-Credits
+CREDIT_WINDOW_SECONDS = 10
+CREDIT_EVENTS = 20000
+CREDIT_BYTES = 20 * 1024 * 1024
+CREDITS = {}   # api_key -> [window_start, events_used, bytes_used]
+
+MAX_RETRY_AFTER = 60
+
+
+async def ingest_worker():
+    while True:
+        payload = await INGEST_QUEUE.get()
+        started = time.monotonic()
+        count = len(payload["events"])
+
+        try:
+            print("\n📦 Received Batch")
+            print("Event Count:", payload["batch_meta"].get("event_count", count))
+
+            for event in payload["events"]:
+                print("→", event["event"]["type"])
+                print(event)
+
+            EVENT_STORE.append(payload)
+            count_events(payload)
+            store_sketches(payload)
+        except Exception as e:
+            # One bad batch must not stop ingestion
+            print("⚠️ Failed to store batch:", repr(e))
+        finally:
+            INGEST_STATE["queued_events"] -= count
+
+        elapsed = max(time.monotonic() - started, 1e-6)
+        INGEST_STATE["drain_rate"] += 0.2 * (count / elapsed - INGEST_STATE["drain_rate"])
+
+        await asyncio.sleep(0)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    worker = asyncio.create_task(ingest_worker())
+    yield
+    worker.cancel()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # For testing only
 API_KEYS = {
@@ -14,21 +90,334 @@ API_KEYS = {
 # Temporary memory storage
 EVENT_STORE = []
 
+# Estimated (project, event type) totals, from sample weights, coalesced
+# counts and pre-aggregated METRICS counts
+EVENT_COUNTS = {}
+
+# Decompressed body cap (guards against compression bombs)
+MAX_BODY_BYTES = 50 * 1024 * 1024
+
+SUPPORTED_ENCODINGS = ["gzip", "deflate"] + (["zstd"] if zstandard else [])
+ACCEPT_ENCODING = ", ".join(SUPPORTED_ENCODINGS)
+
+NDJSON = "application/x-ndjson"
+
+SUPPORTED_CONTENT_TYPES = ["application/json", NDJSON] + (
+    ["application/msgpack"] if msgpack else []
+)
+ACCEPT_POST = ", ".join(SUPPORTED_CONTENT_TYPES)
+
+
+class LimitedDecoder:
+    """
+    Incremental Content-Encoding decoder that answers 413 as soon as
+    its total output passes MAX_BODY_BYTES, without inflating further.
+    """
+
+    def __init__(self, encoding):
+        self.produced = 0
+        self._output = []
+        self._zlib = self._zstd = None
+
+        if encoding == "zstd":
+            # Output reaches write() piece by piece as it's produced
+            self._zstd = zstandard.ZstdDecompressor().stream_writer(self)
+        else:
+            # gzip: 16 + MAX_WBITS, deflate: zlib-wrapped MAX_WBITS
+            wbits = 16 + zlib.MAX_WBITS if encoding == "gzip" else zlib.MAX_WBITS
+            self._zlib = zlib.decompressobj(wbits)
+
+    def write(self, data):
+        self.produced += len(data)
+        if self.produced > MAX_BODY_BYTES:
+            raise HTTPException(status_code=413, detail="Decompressed body too large")
+        self._output.append(data)
+        return len(data)
+
+    def decompress(self, data):
+
+        if self._zstd is not None:
+            self._zstd.write(data)
+        else:
+            while data:
+                self.write(self._zlib.decompress(data, MAX_BODY_BYTES + 1 - self.produced))
+                data = self._zlib.unconsumed_tail
+
+        output, self._output = b"".join(self._output), []
+        return output
+
+
+def body_decoder(content_encoding):
+    """LimitedDecoder for a Content-Encoding, or None for identity."""
+
+    encoding = (content_encoding or "identity").strip().lower()
+
+    if encoding == "identity":
+        return None
+
+    if encoding not in SUPPORTED_ENCODINGS:
+        raise HTTPException(
+            status_code=415,
+            detail=f"Unsupported Content-Encoding: {encoding}",
+            headers={"Accept-Encoding": ACCEPT_ENCODING}
+        )
+
+    return LimitedDecoder(encoding)
+
+
+def decode_body(body_bytes, content_encoding):
+
+    encoding = (content_encoding or "identity").strip().lower()
+    decoder = body_decoder(encoding)
+
+    if decoder is None:
+        return body_bytes
+
+    try:
+        if encoding == "zstd":
+            # Read at most one byte past the cap; never inflate the whole bomb
+            reader = zstandard.ZstdDecompressor().stream_reader(io.BytesIO(body_bytes))
+            parts = []
+            size = 0
+            while size <= MAX_BODY_BYTES:
+                part = reader.read(MAX_BODY_BYTES + 1 - size)
+                if not part:
+                    break
+                parts.append(part)
+                size += len(part)
+            decoded = b"".join(parts)
+        else:
+            decoded = decoder.decompress(body_bytes)
+    except HTTPException:
+        raise
+    except Exception:
+        raise HTTPException(status_code=400, detail="Malformed compressed body")
+
+    if len(decoded) > MAX_BODY_BYTES:
+        raise HTTPException(status_code=413, detail="Decompressed body too large")
+
+    return decoded
+
+
+def too_many_requests(detail, retry_after, headers=None):
+    retry_after = min(MAX_RETRY_AFTER, max(1, math.ceil(retry_after)))
+    return HTTPException(
+        status_code=429,
+        detail=detail,
+        headers={"Retry-After": str(retry_after), **(headers or {})}
+    )
+
+
+def check_ingest_queue():
+    queued = INGEST_STATE["queued_events"]
+
+    if queued >= INGEST_MAX_EVENTS:
+        raise too_many_requests(
+            "Ingest queue full",
+            queued / max(INGEST_STATE["drain_rate"], 1.0)
+        )
+
+
+def take_credits(api_key, events, size):
+    """
+    Charge a batch to the key's window; returns the X-Credits header.
+    A fresh window always admits one batch, however large.
+    """
+
+    now = time.monotonic()
+    window = CREDITS.get(api_key)
+
+    if window is None or now - window[0] >= CREDIT_WINDOW_SECONDS:
+        window = CREDITS[api_key] = [now, 0, 0]
+
+    reset = CREDIT_WINDOW_SECONDS - (now - window[0])
+    fresh = window[1] == 0 and window[2] == 0
+
+    if not fresh and (
+        window[1] + events > CREDIT_EVENTS or window[2] + size > CREDIT_BYTES
+    ):
+        header = credits_header(window, reset)
+        raise too_many_requests("Credits exhausted", reset, {"X-Credits": header})
+
+    window[1] += events
+    window[2] += size
+
+    return credits_header(window, reset)
+
+
+def credits_header(window, reset):
+    return (
+        f"events={max(0, CREDIT_EVENTS - window[1])}, "
+        f"bytes={max(0, CREDIT_BYTES - window[2])}, "
+        f"reset={math.ceil(reset)}"
+    )
+
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+EVENT_FIELDS = ("category", "type", "severity", "status")
+
+
+def decode_columns(columns, strings):
+    # {"s": [...]} holds string-table indexes, {"v": [...]} raw values
+    decoded = {}
+    for key, column in columns.items():
+        if "s" in column:
+            decoded[key] = [None if v is None else strings[v] for v in column["s"]]
+        else:
+            decoded[key] = column["v"]
+    return decoded
+
+
+def decode_columnar_events(payload):
+    """Rebuild v1-shaped events from a schema 2.0 (columnar) batch."""
+
+    strings = payload["strings"]
+    shapes = payload["shapes"]
+    columns = payload["columns"]
+
+    metrics = decode_columns(columns["metrics"], strings)
+    data = decode_columns(columns["data"], strings)
+    base = columns["timestamp_base"]
+
+    events = []
+
+    for i, meta_index in enumerate(columns["meta"]):
+        micros = base + columns["timestamp_delta"][i]
+
+        meta = dict(payload["metas"][meta_index])
+        meta["timestamp"] = (EPOCH + timedelta(microseconds=micros)).isoformat()
+        meta["trace_id"] = columns["trace_id"][i]
+
+        event = {name: strings[columns[name][i]] for name in EVENT_FIELDS}
+        event["metrics"] = {
+            key: metrics[key][i] for key in shapes[columns["metrics_shape"][i]]
+        }
+        event["data"] = {
+            key: data[key][i] for key in shapes[columns["data_shape"][i]]
+        }
+
+        events.append({
+            "meta": meta,
+            "identity": dict(payload["identities"][columns["identity"][i]]),
+            "event": event
+        })
+
+    return events
+
+
+def validate_batch(payload):
+    """400 unless the batch has batch_meta and events shaped {"event": {"type": ...}}."""
+
+    if (
+        not isinstance(payload, dict)
+        or not isinstance(payload.get("batch_meta"), dict)
+        or not isinstance(payload.get("events"), list)
+    ):
+        raise HTTPException(status_code=400, detail="Malformed batch")
+
+    for event in payload["events"]:
+        body = event.get("event") if isinstance(event, dict) else None
+        if not isinstance(body, dict) or not isinstance(body.get("type"), str):
+            raise HTTPException(status_code=400, detail="Malformed event")
+
+
+def media_type_of(content_type):
+    return (content_type or "application/json").split(";")[0].strip().lower()
+
+
+def parse_body(body_bytes, content_type):
 
-def verify_signature(api_key, timestamp, signature, body):
+    media_type = media_type_of(content_type)
+
+    if media_type not in SUPPORTED_CONTENT_TYPES or media_type == NDJSON:
+        raise HTTPException(
+            status_code=415,
+            detail=f"Unsupported Content-Type: {media_type}",
+            headers={"Accept-Post": ACCEPT_POST, "Accept-Encoding": ACCEPT_ENCODING}
+        )
+
+    try:
+        if media_type == "application/msgpack":
+            return msgpack.unpackb(body_bytes, raw=False)
+        if orjson is not None:
+            return orjson.loads(body_bytes)
+        return json.loads(body_bytes)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Malformed body")
+
+
+def parse_line(line):
+    try:
+        return orjson.loads(line) if orjson is not None else json.loads(line)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Malformed NDJSON line")
+
+
+async def read_ndjson(request):
+    """
+    Parse a streamed batch as it arrives: a batch_meta line, then one
+    event per line. Only the current chunk and a partial line are held.
+    """
+
+    decoder = body_decoder(request.headers.get("content-encoding"))
+    payload = {"events": []}
+    pending = b""
+    received = 0
+
+    async for chunk in request.stream():
+        if decoder is not None:
+            try:
+                chunk = decoder.decompress(chunk)
+            except HTTPException:
+                raise
+            except Exception:
+                raise HTTPException(status_code=400, detail="Malformed compressed body")
+
+        received += len(chunk)
+        if received > MAX_BODY_BYTES:
+            raise HTTPException(status_code=413, detail="Decompressed body too large")
+
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()
+
+        for line in lines:
+            if line.strip():
+                add_ndjson_item(payload, parse_line(line))
+
+    if pending.strip():
+        add_ndjson_item(payload, parse_line(pending))
+
+    if "batch_meta" not in payload:
+        raise HTTPException(status_code=400, detail="Missing batch_meta line")
+
+    return payload, received
+
+
+def add_ndjson_item(payload, item):
+    if "batch_meta" not in payload and "batch_meta" in item:
+        payload["batch_meta"] = item["batch_meta"]
+    else:
+        payload["events"].append(item)
+
+
+def verify_signature(api_key, timestamp, signature, body, version=None):
 
     if api_key not in API_KEYS:
         raise HTTPException(status_code=401, detail="Invalid API key")
 
     secret = API_KEYS[api_key]
 
-    message = timestamp + body
+    # Signed over the body bytes as sent, before Content-Encoding
+    mac = hmac.new(secret.encode(), digestmod=hashlib.sha256)
+
+    if version == "2":
+        mac.update(body)
+        mac.update(b"\n" + timestamp.encode())
+    else:
+        mac.update(timestamp.encode() + body)
 
-    expected_signature = hmac.new(
-        secret.encode(),
-        message.encode(),
-        hashlib.sha256
-    ).hexdigest()
+    expected_signature = mac.hexdigest()
 
     if not hmac.compare_digest(signature, expected_signature):
         raise HTTPException(status_code=401, detail="Invalid signature")
@@ -43,33 +432,302 @@ def verify_signature(api_key, timestamp, signature, body):
         raise HTTPException(status_code=400, detail="Invalid timestamp")
 
 
+def count_events(payload):
+    project = payload["batch_meta"].get("project")
+
+    for event in payload["events"]:
+        body = event["event"]
+        metrics = body.get("metrics") or {}
+        # Coalesced summaries stand for `occurrences` repeats
+        weight = metrics.get("sample_weight", 1) * metrics.get("occurrences", 1)
+        event_type = body.get("type")
+
+        if event_type == "METRICS":
+            # Pre-aggregated calls: `count` of the source type, none of them sampled
+            # out; slow outliers aren't in it, they arrive as their own events
+            weight *= metrics.get("count", 0)
+            event_type = (body.get("data") or {}).get("source_type", event_type)
+
+        key = (project, event_type)
+        EVENT_COUNTS[key] = EVENT_COUNTS.get(key, 0) + weight
+
+
+# ----------------------------
+# Latency sketches
+# ----------------------------
+
+# METRICS events carry a latency sketch per key; they're merged across
+# instances into one sketch per (project, key, time bucket)
+SKETCH_ALPHA = 0.01
+SKETCH_MAX_BINS = 2048
+SKETCH_BUCKET_SECONDS = 60
+SKETCH_RETENTION_SECONDS = 24 * 3600
+SKETCHES = {}   # (project, key, bucket_start) -> LatencySketch
+
+# METRICS data fields that aren't part of the key
+SKETCH_VALUE_FIELDS = ("interval_start", "interval_s", "latency_us")
+
+
+class LatencySketch:
+    """DDSketch bins (relative error SKETCH_ALPHA) for merged latencies."""
+
+    def __init__(self):
+        self.log_gamma = math.log((1 + SKETCH_ALPHA) / (1 - SKETCH_ALPHA))
+        self.bins = {}
+        self.zero_count = 0
+        self.count = 0
+        self.min = None
+        self.max = None
+
+    def add(self, value, count=1):
+        if value <= 1e-9:
+            self.zero_count += count
+        else:
+            index = math.ceil(math.log(value) / self.log_gamma)
+            self.bins[index] = self.bins.get(index, 0) + count
+        self.count += count
+
+    def add_bins(self, bins):
+        for index, count in bins:
+            self.bins[index] = self.bins.get(index, 0) + count
+            self.count += count
+
+    def add_sketch(self, sketch):
+        """Merge an SDK sketch dict (ddsketch or log-linear)."""
+
+        scheme = sketch["scheme"]
+
+        if scheme == "ddsketch":
+            bins = [
+                (sketch["offset"] + position, count)
+                for position, count in enumerate(sketch["counts"]) if count
+            ]
+            if sketch["alpha"] == SKETCH_ALPHA:
+                self.add_bins(bins)
+            else:
+                # Re-bin each bin's representative value
+                gamma = (1 + sketch["alpha"]) / (1 - sketch["alpha"])
+                for index, count in bins:
+                    self.add(2 * gamma ** index / (gamma + 1), count)
+
+            self.zero_count += sketch["zero_count"]
+            self.count += sketch["zero_count"]
+
+        elif scheme == "log-linear":
+            sub_bits = sketch["sub_bucket_bits"]
+            for lower, count in sketch["buckets"]:
+                shift = lower.bit_length() - sub_bits
+                width = 1 << shift if shift > 0 else 1
+                self.add(lower + (width - 1) / 2, count)
+
+        else:
+            raise ValueError(f"Unsupported sketch scheme: {scheme}")
+
+        if sketch.get("min") is not None:
+            self.min = sketch["min"] if self.min is None else min(self.min, sketch["min"])
+        if sketch.get("max") is not None:
+            self.max = sketch["max"] if self.max is None else max(self.max, sketch["max"])
+
+        self.collapse()
+
+    def merge(self, other):
+        self.add_bins(other.bins.items())
+        self.zero_count += other.zero_count
+        self.count += other.zero_count
+        for bound in (other.min, other.max):
+            if bound is not None:
+                self.min = bound if self.min is None else min(self.min, bound)
+                self.max = bound if self.max is None else max(self.max, bound)
+        self.collapse()
+
+    def collapse(self):
+        # Fixed memory per key: fold the lowest bins together
+        if len(self.bins) <= SKETCH_MAX_BINS:
+            return
+        indexes = sorted(self.bins)
+        excess = len(indexes) - SKETCH_MAX_BINS
+        self.bins[indexes[excess]] += sum(self.bins.pop(i) for i in indexes[:excess])
+
+    def quantile(self, q):
+        if not self.count:
+            return None
+
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return 0.0
+
+        gamma = math.exp(self.log_gamma)
+        seen = self.zero_count
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen > rank:
+                value = 2 * gamma ** index / (gamma + 1)
+                if self.min is not None:
+                    value = min(max(value, self.min), self.max)
+                return value
+
+        return self.max
+
+
+def sketch_bucket(timestamp):
+    seconds = datetime.fromisoformat(timestamp).timestamp()
+    return int(seconds // SKETCH_BUCKET_SECONDS * SKETCH_BUCKET_SECONDS)
+
+
+def store_sketches(payload):
+    """Merge the latency sketches of a batch's METRICS events."""
+
+    project = payload["batch_meta"].get("project")
+
+    for event in payload["events"]:
+        body = event["event"]
+        if body.get("type") != "METRICS":
+            continue
+
+        data = body["data"]
+        try:
+            key = tuple(sorted(
+                (name, value) for name, value in data.items()
+                if name not in SKETCH_VALUE_FIELDS
+            ))
+            slot = (project, key, sketch_bucket(data["interval_start"]))
+
+            sketch = SKETCHES.get(slot)
+            if sketch is None:
+                sketch = SKETCHES[slot] = LatencySketch()
+            sketch.add_sketch(data["latency_us"])
+        except (KeyError, TypeError, ValueError):
+            print("⚠️ Skipping malformed METRICS event")
+
+    horizon = time.time() - SKETCH_RETENTION_SECONDS
+    for slot in [slot for slot in SKETCHES if slot[2] < horizon]:
+        del SKETCHES[slot]
+
+
 @app.post("/api/logs")
 async def receive_logs(
     request: Request,
+    response: Response,
     x_api_key: str = Header(...),
     x_timestamp: str = Header(...),
-    x_signature: str = Header(...)
+    x_signature: str = Header(...),
+    x_signature_version: str | None = Header(None)
 ):
 
-    body_bytes = await request.body()
-    body_str = body_bytes.decode()
+    # Shed load before reading the body
+    check_ingest_queue()
 
-    # verify_signature(
-    #     x_api_key,
-    #     x_timestamp,
-    #     x_signature,
-    #     body_str
-    # )
+    content_type = request.headers.get("content-type")
 
-    payload = json.loads(body_str)
+    if media_type_of(content_type) == NDJSON:
+        # Streamed batch; the signature covers the decoded NDJSON bytes
+        payload, size = await read_ndjson(request)
+    else:
+        body_bytes = decode_body(
+            await request.body(),
+            request.headers.get("content-encoding")
+        )
 
-    print("\n📦 Received Batch")
-    print("Event Count:", payload["batch_meta"]["event_count"])
+        # verify_signature(
+        #     x_api_key,
+        #     x_timestamp,
+        #     x_signature,
+        #     body_bytes,
+        #     x_signature_version
+        # )
 
-    for event in payload["events"]:
-        print("→", event["event"]["type"])
-        print(event)
+        payload = parse_body(body_bytes, content_type)
+        size = len(body_bytes)
 
-    EVENT_STORE.append(payload)
+    if not isinstance(payload, dict) or not isinstance(payload.get("batch_meta"), dict):
+        raise HTTPException(status_code=400, detail="Malformed batch")
 
+    if payload["batch_meta"].get("schema_version") == "2.0":
+        try:
+            payload["events"] = decode_columnar_events(payload)
+        except (KeyError, IndexError, TypeError, ValueError, AttributeError):
+            raise HTTPException(status_code=400, detail="Malformed columnar batch")
+
+    validate_batch(payload)
+
+    count = len(payload["events"])
+    response.headers["X-Credits"] = take_credits(x_api_key, count, size)
+
+    INGEST_QUEUE.put_nowait(payload)
+    INGEST_STATE["queued_events"] += count
+
+    response.headers["Accept-Encoding"] = ACCEPT_ENCODING
+    response.headers["Accept-Post"] = ACCEPT_POST
     return {"status": "received"}
+
+
+@app.get("/api/event_counts")
+def event_counts(project: str | None = None):
+    """Events per type, extrapolated from sample weights, coalesced and aggregated counts."""
+
+    return {
+        "results": [
+            {"project": key[0], "type": key[1], "estimated_count": round(count)}
+            for key, count in EVENT_COUNTS.items()
+            if project is None or key[0] == project
+        ]
+    }
+
+
+@app.get("/api/quantiles")
+def latency_quantiles(
+    request: Request,
+    project: str | None = None,
+    since: str | None = None,
+    until: str | None = None,
+    q: str = "0.5,0.95,0.99"
+):
+    """
+    Latency quantiles (ms) per key, merged across instances and time
+    buckets. Other query parameters filter on key fields, e.g.
+    ?source_type=INCOMING_REQUEST&route=/api/orders/{id}
+    """
+
+    try:
+        quantiles = [float(value) for value in q.split(",")]
+        start = sketch_bucket(since) if since else None
+        end = sketch_bucket(until) if until else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid q, since or until")
+
+    reserved = {"project", "since", "until", "q"}
+    filters = {
+        name: value for name, value in request.query_params.items()
+        if name not in reserved
+    }
+
+    merged = {}
+
+    for (sketch_project, key, bucket), sketch in SKETCHES.items():
+        if project is not None and sketch_project != project:
+            continue
+        if (start is not None and bucket < start) or (end is not None and bucket > end):
+            continue
+
+        fields = dict(key)
+        if any(str(fields.get(name)) != value for name, value in filters.items()):
+            continue
+
+        group = merged.get((sketch_project, key))
+        if group is None:
+            group = merged[(sketch_project, key)] = LatencySketch()
+        group.merge(sketch)
+
+    results = []
+    for (sketch_project, key), sketch in merged.items():
+        results.append({
+            "project": sketch_project,
+            "key": dict(key),
+            "count": sketch.count,
+            "quantiles_ms": {
+                f"p{value * 100:g}": round(sketch.quantile(value) / 1000, 3)
+                for value in quantiles
+            }
+        })
+
+    return {"bucket_seconds": SKETCH_BUCKET_SECONDS, "results": results}